@@ -1,40 +1,86 @@
 from elevenlabs import ElevenLabs
 import os
+from contextlib import nullcontext
 from dotenv import load_dotenv
+try:
+    from backend.breaker import CircuitBreaker
+    from backend import cassette
+    from backend.clients import ClientPool, PooledClient
+except ModuleNotFoundError:
+    from breaker import CircuitBreaker
+    import cassette
+    from clients import ClientPool, PooledClient
 
 load_dotenv()
 
 class AudioEngine:
-    def __init__(self):
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler  # Optional fair-queuing admission control for upstream calls
+        # Judge-supplied keys get their own pre-built clients; see register_key()
+        self.pool = ClientPool(
+            "elevenlabs",
+            lambda key: cassette.wrap_elevenlabs(ElevenLabs(api_key=key)),
+            lambda: CircuitBreaker("elevenlabs")
+        )
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         if not self.api_key:
             print("Warning: ELEVENLABS_API_KEY not set")
         
         try:
-            self.client = ElevenLabs(api_key=self.api_key)
+            client = cassette.wrap_elevenlabs(ElevenLabs(api_key=self.api_key))
             print("ElevenLabs Client Initialized")
         except Exception as e:
             print(f"Failed to init ElevenLabs: {e}")
-            self.client = None
+            client = None
 
-    def configure(self, api_key: str):
+        # Server-wide client, used by sessions that haven't registered their own key
+        self.default = PooledClient(client, CircuitBreaker("elevenlabs"), self.api_key)
+
+    @property
+    def client(self):
         """
-        Re-configure the client with a specific API key.
+        The client for the current request: the session's pooled client if it registered
+        its own key via /api/config, otherwise the server's default client.
         """
-        try:
-            os.environ["ELEVENLABS_API_KEY"] = api_key
-            self.api_key = api_key
-            self.client = ElevenLabs(api_key=self.api_key)
-            print("ElevenLabs Client Re-Initialized via Keys")
-        except Exception as e:
-            print(f"Failed to re-init ElevenLabs: {e}")
-            self.client = None
+        return self.pool.current_or(self.default).client
+
+    @property
+    def breaker(self):
+        return self.pool.current_or(self.default).breaker
+
+    def has_credentials(self) -> bool:
+        """
+        True if the default client can reach ElevenLabs (replay needs no key).
+        """
+        return bool(self.api_key) or cassette.MODE == "replay"
+
+    def current_api_key(self):
+        """
+        Raw ElevenLabs key for the current request (for endpoints that need the key itself).
+        """
+        return self.pool.current_or(self.default).api_key
+
+    def register_key(self, api_key: str):
+        """
+        Pre-builds a pooled client for `api_key`.
+        """
+        self.pool.acquire(api_key)
+
+    def _slot(self):
+        return self.scheduler.slot() if self.scheduler else nullcontext()
+
+    def _guarded_stream(self, audio_stream, breaker):
+        # Breaker judges time-to-first-chunk, since convert() only calls out once consumed
+        with breaker.guard() as timer:
+            for chunk in audio_stream:
+                timer.mark()
+                yield chunk
 
     def generate_speech_stream(self, text: str, voice_id: str):
         """
         Generates TTS audio stream with latency optimization.
         """
-        if not self.client:
+        if not self.client or self.breaker.is_open:
             return None
         
         try:
@@ -46,6 +92,10 @@ class AudioEngine:
                 output_format="mp3_22050_32",  # Lower quality = faster streaming
                 optimize_streaming_latency=4   # Maximum latency optimization
             )
+            audio_stream = self._guarded_stream(audio_stream, self.breaker)
+            if self.scheduler:
+                # convert() is lazy: the request happens while the stream is consumed
+                return self.scheduler.scheduled_iter(audio_stream)
             return audio_stream
         except Exception as e:
             print(f"TTS Error: {e}")
@@ -73,18 +123,20 @@ class AudioEngine:
                 return f.read() # Return bytes directly
             
         try:
-            # Using sound effects endpoint
-            response = self.client.text_to_sound_effects.convert(
-                text=text,
-                duration_seconds=None, 
-                prompt_influence=0.3
-            )
-            
-            # Consume generator to bytes
-            audio_data = b""
-            for chunk in response:
-                if chunk:
-                    audio_data += chunk
+            self.breaker.check()  # Fail fast instead of queueing for a dead upstream
+            with self._slot(), self.breaker.guard():
+                # Using sound effects endpoint
+                response = self.client.text_to_sound_effects.convert(
+                    text=text,
+                    duration_seconds=None, 
+                    prompt_influence=0.3
+                )
+                
+                # Consume generator to bytes
+                audio_data = b""
+                for chunk in response:
+                    if chunk:
+                        audio_data += chunk
             
             # Save to cache
             with open(filepath, "wb") as f:
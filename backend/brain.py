@@ -1,67 +1,192 @@
 import os
+from contextlib import nullcontext, contextmanager, asynccontextmanager
 from google import genai
 from dotenv import load_dotenv
+try:
+    from backend.jsonstream import JsonArrayStreamParser
+    from backend.breaker import CircuitBreaker, CircuitOpen
+    from backend import cassette
+    from backend.models import ModelTiers
+    from backend.clients import ClientPool, PooledClient
+except ModuleNotFoundError:
+    from jsonstream import JsonArrayStreamParser
+    from breaker import CircuitBreaker, CircuitOpen
+    import cassette
+    from models import ModelTiers
+    from clients import ClientPool, PooledClient
 
 load_dotenv()
 
 class Brain:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, scheduler=None):
+        self.scheduler = scheduler  # Optional fair-queuing admission control for upstream calls
+        # Per-call-type model, token/thinking budget and timeout. Recordings are keyed by model,
+        # so tiers stay on the primary while recording or replaying cassettes
+        self.models = ModelTiers(pin_primary=cassette.MODE in ("record", "replay"))
+        # Judge-supplied keys get their own pre-built clients; see register_key()
+        self.pool = ClientPool(
+            "gemini",
+            lambda key: cassette.wrap_genai(genai.Client(api_key=key)),
+            lambda: CircuitBreaker("gemini")
+        )
         self.project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
         self.location = os.getenv("GOOGLE_CLOUD_LOCATION")
-        self.client = None
+        client = None
+        key = None
 
         # Try configuring with env vars first (Vertex)
         if self.project_id and self.location:
             try:
-                self.client = genai.Client(
+                client = cassette.wrap_genai(genai.Client(
                     vertexai=True,
                     project=self.project_id,
                     location=self.location
-                )
+                ))
                 print(f"Brain connected to Vertex AI project: {self.project_id}")
             except Exception as e:
                 print(f"Failed to connect to Vertex AI: {e}")
         
         # If Vertex failed or not configured, try API key (Env or Passed)
-        if not self.client:
+        if not client:
             key = api_key or os.getenv("GEMINI_API_KEY")
             if key:
-                self.configure(key)
+                try:
+                    client = cassette.wrap_genai(genai.Client(api_key=key))
+                    print("Brain connected via Gemini API Key")
+                except Exception as e:
+                    print(f"Failed to connect via API Key: {e}")
             else:
                 print("Warning: No Vertex Project or Gemini API Key found.")
 
-    def configure(self, api_key: str):
+        if not client and cassette.MODE == "replay":
+            # Replay needs no credentials: every response comes from the cassette store
+            client = cassette.wrap_genai(None)
+            print(f"Brain replaying upstream traffic from {cassette.CASSETTE_DIR}")
+
+        # Server-wide client, used by sessions that haven't registered their own key
+        self.default = PooledClient(client, CircuitBreaker("gemini"), key)
+
+    @property
+    def client(self):
         """
-        Re-configure the client with a specific API key (Gemini API mode).
+        The client for the current request: the session's pooled client if it registered
+        its own key via /api/config, otherwise the server's default client.
         """
-        try:
-            os.environ["GEMINI_API_KEY"] = api_key # Update env for other usages checks
-            self.client = genai.Client(api_key=api_key)
-            print("Brain connected via Gemini API Key")
-        except Exception as e:
-            print(f"Failed to connect via API Key: {e}")
-            self.client = None
+        return self.pool.current_or(self.default).client
+
+    @property
+    def breaker(self):
+        return self.pool.current_or(self.default).breaker
+
+    def register_key(self, api_key: str):
+        """
+        Pre-builds a pooled client for `api_key`.
+        Nothing global changes: requests only use it once their session is bound to the key.
+        """
+        self.pool.acquire(api_key)
+
+    def _slot(self, session=None, job_class=None):
+        return self.scheduler.slot(session, job_class) if self.scheduler else nullcontext()
+
+    def _aslot(self):
+        return self.scheduler.aslot() if self.scheduler else nullcontext()
+
+    @contextmanager
+    def upstream(self, session=None, job_class=None):
+        """
+        Wraps one Gemini call: fails fast if the breaker is open, otherwise queues for a
+        scheduler slot and reports the outcome to the breaker. Yields a timer; streaming
+        callers should call timer.mark() on the first chunk.
+        """
+        self.breaker.check()
+        with self._slot(session, job_class), self.breaker.guard() as timer:
+            yield timer
+
+    @asynccontextmanager
+    async def aupstream(self):
+        self.breaker.check()
+        async with self._aslot():
+            with self.breaker.guard() as timer:
+                yield timer
+
+    def generate(self, call_type: str, contents, system_instruction: str = None):
+        """
+        One generate_content call on the model tier selected for `call_type`.
+        Records latency and token usage for tiering. Raises on failure.
+        """
+        tier = self.models.select(call_type)
+        with self.upstream() as timer:
+            try:
+                response = self.client.models.generate_content(
+                    model=tier.model,
+                    contents=contents,
+                    config=tier.config(system_instruction)
+                )
+            except Exception:
+                self.models.record_error(tier.model)
+                raise
+        self.models.record(tier.model, call_type, timer.elapsed(), getattr(response, "usage_metadata", None))
+        return response
+
+    async def agenerate(self, call_type: str, contents, system_instruction: str = None):
+        """
+        Async version of generate(); the sync SDK call runs in a worker thread.
+        """
+        import asyncio
+        tier = self.models.select(call_type)
+        async with self.aupstream() as timer:
+            try:
+                # On the scheduler's executor when there is one, see Scheduler.run()
+                run = self.scheduler.run if self.scheduler else asyncio.to_thread
+                response = await run(
+                    self.client.models.generate_content,
+                    model=tier.model,
+                    contents=contents,
+                    config=tier.config(system_instruction)
+                )
+            except Exception:
+                self.models.record_error(tier.model)
+                raise
+        self.models.record(tier.model, call_type, timer.elapsed(), getattr(response, "usage_metadata", None))
+        return response
+
+    def generate_stream(self, call_type: str, contents, session=None, job_class=None):
+        """
+        Streaming generate_content on the tier for `call_type`. Yields chunks.
+        Latency is recorded as time-to-first-chunk.
+        """
+        tier = self.models.select(call_type)
+        usage = None
+        with self.upstream(session, job_class) as timer:
+            try:
+                response = self.client.models.generate_content_stream(
+                    model=tier.model,
+                    contents=contents,
+                    config=tier.config()
+                )
+                for chunk in response:
+                    timer.mark()
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    yield chunk
+            except Exception:
+                self.models.record_error(tier.model)
+                raise
+        self.models.record(tier.model, call_type, timer.elapsed(), usage)
 
     async def generate_response_async(self, user_input: str, system_instruction: str = None) -> str:
         """
         Asynchronously generates a response for a specific persona.
+        Raises CircuitOpen if Gemini's breaker rejects the call.
         """
         if not self.client:
             return "Error: Brain not connected."
 
-        model_id = "gemini-2.5-flash-lite"
-        config = {'system_instruction': system_instruction} if system_instruction else {}
-
         try:
-            # genai.Client is sync, so we run in a thread to keep the loop free
-            import asyncio
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
-                model=model_id,
-                contents=user_input,
-                config=config
-            )
+            # genai.Client is sync, so agenerate runs it in a thread to keep the loop free
+            response = await self.agenerate("persona", user_input, system_instruction)
             return response.text
+        except CircuitOpen:
+            raise  # Callers answer with a canned in-character line instead
         except Exception as e:
             print(f"Error generating async content: {e}")
             return "Thinking..."
@@ -69,23 +194,16 @@ class Brain:
     def generate_response(self, user_input: str, system_instruction: str = None) -> str:
         """
         Generates a response for a specific persona.
+        Raises CircuitOpen if Gemini's breaker rejects the call.
         """
         if not self.client:
             return "Error: Brain not connected."
 
-        # User's test script used 'gemini-2.5-flash-lite', but plan said 1.5. 
-        # Using what user verified works: 'gemini-2.5-flash-lite'
-        model_id = "gemini-2.5-flash-lite" 
-        
-        config = {'system_instruction': system_instruction} if system_instruction else {}
-
         try:
-            response = self.client.models.generate_content(
-                model=model_id,
-                contents=user_input,
-                config=config
-            )
+            response = self.generate("persona", user_input, system_instruction)
             return response.text
+        except CircuitOpen:
+            raise  # Callers answer with a canned in-character line instead
         except Exception as e:
             print(f"Error generating content: {e}")
             return "Thinking..."
@@ -114,14 +232,9 @@ class Brain:
         User Input: "{user_input}"
         """
         
-        # Using a cheaper model for routing if available, or same one.
-        model_id = "gemini-2.5-flash-lite"
-        
         try:
-            response = self.client.models.generate_content(
-                model=model_id,
-                contents=prompt
-            )
+            # Routing tier: tiny output budget, no thinking
+            response = self.generate("routing", prompt)
             decision = response.text.strip().replace(".", "")
             valid_personas = ["Joy", "Sadness", "Anger", "Fear", "Disgust"]
             
@@ -140,8 +253,17 @@ class Brain:
         Generates a high-energy, personality-driven 'Fun Mode' interaction.
         Returns a list of dicts: [{"persona": "Joy", "text": "..."}]
         """
+        return list(self.generate_fun_mode_script_stream(topic))
+
+    def generate_fun_mode_script_stream(self, topic: str):
+        """
+        Streaming version of generate_fun_mode_script.
+        Yields each {"persona", "text"} dict as soon as its JSON object closes.
+        A malformed or truncated item is skipped without losing the rest of the script.
+        Raises CircuitOpen if Gemini's breaker rejects the call.
+        """
         if not self.client:
-            return []
+            return
 
         prompt = f"""
         Act as the 'Headquarters' of a human mind. 
@@ -172,16 +294,24 @@ class Brain:
         Do not include markdown code blocks.
         """
         
+        valid_personas = ["Joy", "Sadness", "Anger", "Fear", "Disgust"]
+        parser = JsonArrayStreamParser()
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=prompt
-            )
-            import json
-            text = response.text.replace("```json", "").replace("```", "").strip()
-            script = json.loads(text)
-            return script
+            for chunk in self.generate_stream("script", prompt):
+                if not chunk.text:
+                    continue
+                for item in parser.feed(chunk.text):
+                    persona_name = item.get("persona")
+                    text = item.get("text")
+                    if persona_name in valid_personas and isinstance(text, str) and text.strip():
+                        yield {"persona": persona_name, "text": text.strip()}
+                    else:
+                        parser.reject(item)
+        except CircuitOpen:
+            raise
         except Exception as e:
             print(f"Fun Mode Script Error: {e}")
-            return []
-
+        finally:
+            parser.close()
+            if parser.dropped:
+                print(f"Fun Mode Script: dropped {parser.dropped} malformed item(s)")
@@ -0,0 +1,161 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling an upstream whose breaker is open.
+    """
+
+
+class _Timer:
+    """
+    Measures upstream latency. Streaming callers call mark() on the first chunk,
+    so the breaker judges time-to-first-byte rather than total stream length.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.marked = None
+
+    def mark(self):
+        if self.marked is None:
+            self.marked = time.monotonic()
+
+    def elapsed(self) -> float:
+        return (self.marked or time.monotonic()) - self.started
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker (closed / open / half-open).
+
+    Trips when, over the last `window` seconds, at least `min_calls` calls were made and the share
+    of failed or slow calls reaches `error_rate`. While open, calls fail immediately with CircuitOpen.
+    After `cooldown` seconds a single probe call is let through (half-open); its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        prefix = f"BREAKER_{name.upper()}_"
+        self.error_rate = float(os.getenv(prefix + "ERROR_RATE", os.getenv("BREAKER_ERROR_RATE", "0.5")))
+        self.min_calls = int(os.getenv(prefix + "MIN_CALLS", os.getenv("BREAKER_MIN_CALLS", "4")))
+        self.slow_call = float(os.getenv(prefix + "SLOW_MS", os.getenv("BREAKER_SLOW_MS", "8000"))) / 1000
+        self.window = float(os.getenv(prefix + "WINDOW_S", os.getenv("BREAKER_WINDOW_S", "30")))
+        self.cooldown = float(os.getenv(prefix + "COOLDOWN_S", os.getenv("BREAKER_COOLDOWN_S", "15")))
+
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.calls = deque()  # (timestamp, failed)
+        self.last_error = None
+
+    @property
+    def is_open(self) -> bool:
+        """
+        True while calls would be rejected: open and still cooling down, or a half-open probe
+        is already in flight. Callers use this to take the degraded path up front.
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self.opened_at < self.cooldown:
+                return True
+            return self.probe_in_flight
+
+    def _allow(self) -> bool:
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def _record(self, failed):
+        """
+        failed=None means the call was abandoned (cancelled / client went away): no verdict.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                if failed is None:
+                    return
+                if failed:
+                    self._trip(now)
+                else:
+                    print(f"Circuit breaker [{self.name}] closed")
+                    self.state = CLOSED
+                    self.calls.clear()
+                return
+
+            if failed is None:
+                return
+            self.calls.append((now, failed))
+            while self.calls and now - self.calls[0][0] > self.window:
+                self.calls.popleft()
+            failures = sum(1 for _, f in self.calls if f)
+            if self.state == CLOSED and len(self.calls) >= self.min_calls and failures / len(self.calls) >= self.error_rate:
+                self._trip(now)
+
+    def _trip(self, now):
+        # Caller holds self.lock
+        print(f"Circuit breaker [{self.name}] OPEN (last error: {self.last_error})")
+        self.state = OPEN
+        self.opened_at = now
+        self.calls.clear()
+
+    def check(self):
+        """
+        Fails fast if the breaker is open, without taking the half-open probe.
+        """
+        if self.is_open:
+            raise CircuitOpen(f"{self.name} unavailable")
+
+    @contextmanager
+    def guard(self):
+        """
+        Wraps one upstream call, recording its outcome and latency. Yields a timer with mark().
+        """
+        if not self._allow():
+            raise CircuitOpen(f"{self.name} unavailable")
+        timer = _Timer()
+        try:
+            yield timer
+        except Exception as e:
+            self.last_error = repr(e)
+            self._record(True)
+            raise
+        except BaseException:
+            self._record(None)
+            raise
+        slow = timer.elapsed() >= self.slow_call
+        if slow:
+            self.last_error = f"slow call ({timer.elapsed():.1f}s)"
+        self._record(slow)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            state = self.state
+            if state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                state = HALF_OPEN  # Next call will probe
+            failures = sum(1 for _, f in self.calls if f)
+            return {
+                "state": state,
+                "recent_calls": len(self.calls),
+                "recent_failures": failures,
+                "retry_in_s": round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1) if self.state == OPEN else 0,
+                "last_error": self.last_error,
+            }
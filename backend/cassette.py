@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+from types import SimpleNamespace
+
+# off: talk to upstreams normally
+# record: talk to upstreams and save every exchange (with chunk timings) to the cassette dir
+# replay: never touch the network; serve saved exchanges with their original timing
+MODE = os.getenv("UPSTREAM_CASSETTE", "off").lower()
+CASSETTE_DIR = os.getenv("UPSTREAM_CASSETTE_DIR", "cassettes")
+# Multiplier on recorded delays during replay: 1 = original timing, 0.5 = twice as fast, 0 = instant
+REPLAY_SCALE = float(os.getenv("UPSTREAM_REPLAY_SCALE", "1.0"))
+
+
+class CassetteMiss(Exception):
+    """
+    Replay mode got a request that was never recorded.
+    """
+
+
+class ReplayedError(Exception):
+    """
+    Replays an upstream error that happened while recording.
+    """
+
+
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True, mode="json")
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+class CassetteStore:
+    """
+    One JSON file per distinct request (keyed by a hash of kind + request), holding every
+    recorded exchange for it in order. Replay walks through them in the same order.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.cursors = {}  # key -> next exchange index during replay
+        self.misses = 0  # Replay requests with no recording; callers may swallow the CassetteMiss
+
+    def key(self, kind: str, request: dict) -> str:
+        raw = json.dumps({"kind": kind, "request": request}, sort_keys=True)
+        return f"{kind}-{hashlib.sha256(raw.encode()).hexdigest()[:24]}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def append(self, key: str, request: dict, exchange: dict):
+        with self.lock:
+            path = self._path(key)
+            record = {"request": request, "exchanges": []}
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            record["exchanges"].append(exchange)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(record, f, indent=1)
+
+    def next(self, key: str) -> dict:
+        with self.lock:
+            path = self._path(key)
+            if not os.path.exists(path):
+                self.misses += 1
+                raise CassetteMiss(f"No recording for {key}")
+            with open(path, "r", encoding="utf-8") as f:
+                exchanges = json.load(f)["exchanges"]
+            index = self.cursors.get(key, 0)
+            self.cursors[key] = index + 1
+            return exchanges[index % len(exchanges)]
+
+    def rewind(self):
+        with self.lock:
+            self.cursors.clear()
+
+
+store = CassetteStore(CASSETTE_DIR)
+
+
+def _replay_chunks(exchange: dict):
+    """
+    Yields recorded chunks, sleeping so each lands at its (scaled) original offset.
+    """
+    started = time.monotonic()
+    for chunk in exchange["chunks"]:
+        delay = chunk["t"] * REPLAY_SCALE - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
+        yield chunk
+    if exchange.get("error"):
+        delay = exchange.get("t_end", 0) * REPLAY_SCALE - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
+        raise ReplayedError(exchange["error"])
+
+
+def _record_chunks(key, request, iterator, to_json):
+    """
+    Passes chunks through from the live upstream while timing each one, then saves the exchange.
+    Only a stream that ran to the end or failed upstream is saved; one the consumer abandoned
+    (GeneratorExit on close, cancellation) would replay as a truncated but "complete" answer.
+    """
+    started = time.monotonic()
+    chunks = []
+
+    def save(**extra):
+        store.append(key, request, {"chunks": chunks, "t_end": round(time.monotonic() - started, 4), **extra})
+
+    try:
+        for item in iterator:
+            chunks.append({"t": round(time.monotonic() - started, 4), **to_json(item)})
+            yield item
+    except Exception as e:
+        save(error=repr(e))
+        raise
+    save()
+
+
+# --- Gemini (google-genai) -------------------------------------------------
+
+def _genai_chunk_json(response) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    return {"text": response.text, "usage": _jsonable(usage) if usage else None}
+
+
+def _genai_replay_response(chunk: dict):
+    usage = chunk.get("usage")
+    return SimpleNamespace(
+        text=chunk.get("text"),
+        usage_metadata=SimpleNamespace(**usage) if usage else None
+    )
+
+
+class _GenaiModels:
+    def __init__(self, models):
+        self.models = models
+
+    def generate_content(self, *, model, contents, config=None):
+        request = {"model": model, "contents": _jsonable(contents), "config": _jsonable(config)}
+        key = store.key("genai", request)
+        if MODE == "replay":
+            chunks = list(_replay_chunks(store.next(key)))
+            return _genai_replay_response(chunks[-1]) if chunks else _genai_replay_response({})
+        call = lambda: iter([self.models.generate_content(model=model, contents=contents, config=config)])
+        return list(_record_chunks(key, request, _lazy(call), _genai_chunk_json))[0]
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        request = {"model": model, "contents": _jsonable(contents), "config": _jsonable(config), "stream": True}
+        key = store.key("genai", request)
+        if MODE == "replay":
+            return (_genai_replay_response(c) for c in _replay_chunks(store.next(key)))
+        call = lambda: self.models.generate_content_stream(model=model, contents=contents, config=config)
+        return _record_chunks(key, request, _lazy(call), _genai_chunk_json)
+
+
+class RecordingGenaiClient:
+    """
+    Stand-in for genai.Client exposing the `models` methods Brain uses.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.models = _GenaiModels(client.models if client else None)
+
+
+# --- ElevenLabs -------------------------------------------------------------
+
+def _audio_chunk_json(data: bytes) -> dict:
+    return {"data": base64.b64encode(data).decode("ascii")}
+
+
+class _AudioEndpoint:
+    def __init__(self, kind, endpoint):
+        self.kind = kind
+        self.endpoint = endpoint
+
+    def convert(self, *args, **kwargs):
+        request = {"args": _jsonable(args), "kwargs": _jsonable(kwargs)}
+        key = store.key(self.kind, request)
+        if MODE == "replay":
+            return (base64.b64decode(c["data"]) for c in _replay_chunks(store.next(key)))
+        return _record_chunks(key, request, _lazy(lambda: self.endpoint.convert(*args, **kwargs)), _audio_chunk_json)
+
+
+class RecordingElevenLabs:
+    """
+    Stand-in for the ElevenLabs client exposing the endpoints AudioEngine uses.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.text_to_speech = _AudioEndpoint("tts", client.text_to_speech if client else None)
+        self.text_to_sound_effects = _AudioEndpoint("sfx", client.text_to_sound_effects if client else None)
+
+
+def _lazy(call):
+    # Defers the upstream call until iteration, so request errors are recorded too
+    yield from call()
+
+
+def wrap_genai(client):
+    """
+    Returns `client` unchanged when cassettes are off. In replay mode works without a real client.
+    """
+    if MODE not in ("record", "replay") or (client is None and MODE != "replay"):
+        return client
+    return RecordingGenaiClient(client)
+
+
+def wrap_elevenlabs(client):
+    if MODE not in ("record", "replay") or (client is None and MODE != "replay"):
+        return client
+    return RecordingElevenLabs(client)
@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+
+# API keys bound to the current request's session: {"gemini": key, "elevenlabs": key}
+current_credentials = contextvars.ContextVar("current_credentials", default=None)
+
+
+def credential_hash(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+
+class PooledClient:
+    """
+    A ready-to-use upstream client plus the state that belongs to its credential.
+    """
+
+    def __init__(self, client, breaker, api_key: str):
+        self.client = client
+        self.breaker = breaker  # Per-credential, so one bad key can't trip everyone's breaker
+        self.api_key = api_key  # Needed for endpoints that take a raw key (Scribe tokens)
+        self.last_used = time.monotonic()
+
+
+class ClientPool:
+    """
+    LRU pool of pre-built clients keyed by credential hash, with idle eviction.
+    Clients are built once per key and reused, so warm connections survive across requests.
+    An evicted client is rebuilt on its session's next request, so a binding never silently
+    falls back to the server's default key.
+    """
+
+    def __init__(self, name: str, factory, breaker_factory):
+        self.name = name
+        self.factory = factory  # api_key -> client
+        self.breaker_factory = breaker_factory
+        self.max_size = int(os.getenv("CLIENT_POOL_SIZE", "32"))
+        self.idle_ttl = float(os.getenv("CLIENT_POOL_IDLE_S", "1800"))
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # credential hash -> PooledClient, least recently used first
+
+    def acquire(self, api_key: str) -> PooledClient:
+        """
+        Returns the pooled client for `api_key`, building it if it isn't (or is no longer) pooled.
+        """
+        key_hash = credential_hash(api_key)
+        with self.lock:
+            self._evict_idle()
+            entry = self.entries.get(key_hash)
+            if entry:
+                entry.last_used = time.monotonic()
+                self.entries.move_to_end(key_hash)
+                return entry
+
+        # Build outside the lock: client construction can be slow
+        entry = PooledClient(self.factory(api_key), self.breaker_factory(), api_key)
+        with self.lock:
+            entry = self.entries.setdefault(key_hash, entry)
+            self.entries.move_to_end(key_hash)
+            while len(self.entries) > self.max_size:
+                evicted, _ = self.entries.popitem(last=False)
+                print(f"{self.name} client pool: evicted {evicted[:8]} (pool full)")
+        print(f"{self.name} client pool: built {key_hash[:8]} ({len(self.entries)} clients)")
+        return entry
+
+    def current(self):
+        """
+        The pooled client bound to the current request, or None to use the default client.
+        """
+        credentials = current_credentials.get()
+        if not credentials or not credentials.get(self.name):
+            return None
+        return self.acquire(credentials[self.name])
+
+    def current_or(self, default: PooledClient) -> PooledClient:
+        """
+        The pooled client bound to the current request, falling back to the server's `default`.
+        """
+        return self.current() or default
+
+    def _evict_idle(self):
+        # Caller holds self.lock
+        cutoff = time.monotonic() - self.idle_ttl
+        for key_hash in [k for k, e in self.entries.items() if e.last_used < cutoff]:
+            del self.entries[key_hash]
+            print(f"{self.name} client pool: evicted {key_hash[:8]} (idle)")
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            self._evict_idle()
+            return {"clients": len(self.entries), "max_size": self.max_size, "idle_ttl_s": self.idle_ttl}
+
+
+class CredentialBindings:
+    """
+    Maps session id -> API keys set via /api/config. Session ids are signed ids issued by the
+    server (see sessions.py), never client addresses, so callers behind the same proxy can't
+    pick up each other's keys.
+    Bindings expire after CLIENT_POOL_IDLE_S without use.
+    """
+
+    def __init__(self):
+        self.max_sessions = int(os.getenv("CREDENTIAL_SESSIONS_MAX", "1000"))
+        self.idle_ttl = float(os.getenv("CLIENT_POOL_IDLE_S", "1800"))
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # session id -> (credentials dict, last_used)
+
+    def bind(self, session_id: str, **api_keys):
+        with self.lock:
+            credentials = dict(self.sessions.pop(session_id, ({}, 0))[0])
+            credentials.update({k: v for k, v in api_keys.items() if v})
+            self.sessions[session_id] = (credentials, time.monotonic())
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return credentials
+
+    def get(self, session_id: str):
+        with self.lock:
+            binding = self.sessions.get(session_id)
+            if not binding:
+                return None
+            credentials, last_used = binding
+            if time.monotonic() - last_used > self.idle_ttl:
+                del self.sessions[session_id]
+                return None
+            self.sessions[session_id] = (credentials, time.monotonic())
+            self.sessions.move_to_end(session_id)
+            return credentials
@@ -0,0 +1,145 @@
+import os
+import random
+import hashlib
+
+# Short in-character reactions played while the real answer is still being generated.
+FILLER_LINES = {
+    "Joy": ["Ooh!", "Ooh ooh ooh!", "Oh, I love this!"],
+    "Sadness": ["Oh... hmm...", "*sigh* Okay...", "Well..."],
+    "Anger": ["Ugh...", "Oh, GREAT.", "Hold on..."],
+    "Fear": ["Wait wait wait", "Uh-oh...", "Oh no, okay, um..."],
+    "Disgust": ["Ugh. Fine.", "Hmm. Really?", "Excuse me?"],
+}
+
+# Complete in-character answers served while Gemini is unavailable (breaker open).
+CANNED_LINES = {
+    "Joy": [
+        "Okay, my brain's doing a little cartwheel right now, but I KNOW we'll figure this out together!",
+        "Ooh, give me one second, the idea machine is warming up! Ask me again?",
+    ],
+    "Sadness": [
+        "I'm sorry... I can't quite find the words right now. Can we try again in a bit?",
+        "Everything feels kind of foggy in here at the moment...",
+    ],
+    "Anger": [
+        "THE CONSOLE IS ACTING UP AGAIN! Give me a minute before I flip a switch!",
+        "Oh, PERFECT. Headquarters picks NOW to jam. Try me again shortly!",
+    ],
+    "Fear": [
+        "Okay, don't panic, but the control panel is being weird. Let's wait a moment, okay?",
+        "Something's not responding and I don't like it one bit. Try again soon?",
+    ],
+    "Disgust": [
+        "Ugh, Headquarters is having a moment. Come back when it's less embarrassing.",
+        "I'm not answering that until this console gets its act together.",
+    ],
+}
+
+
+class FillerBank:
+    """
+    Pool of pre-synthesised filler clips, indexed by (persona, voice_id).
+    Clips are synthesised once and cached on disk, so emitting one is instant.
+    Also holds the canned answers used in degraded mode when an upstream is down.
+    """
+
+    def __init__(self, audio_engine, cache_dir="assets/fillers"):
+        self.audio_engine = audio_engine
+        self.cache_dir = cache_dir
+        self.clips = {}  # (persona, voice_id) -> [(text, bytes), ...]
+        self.canned = {}  # (persona, voice_id) -> {text: bytes}
+        # Skip the filler when the real audio arrives within this window
+        self.threshold = float(os.getenv("FILLER_THRESHOLD_MS", "700")) / 1000
+        self.enabled = os.getenv("FILLER_ENABLED", "true").lower() != "false"
+
+    def _cache_path(self, voice_id: str, text: str) -> str:
+        filename = hashlib.md5(f"{voice_id}:{text}".encode()).hexdigest() + ".mp3"
+        return os.path.join(self.cache_dir, filename)
+
+    def _synthesise(self, text: str, voice_id: str, cache_only: bool = False):
+        filepath = self._cache_path(voice_id, text)
+        if os.path.exists(filepath):
+            with open(filepath, "rb") as f:
+                return f.read()
+        if cache_only:
+            return None
+
+        audio_stream = self.audio_engine.generate_speech_stream(text, voice_id)
+        if not audio_stream:
+            return None
+
+        try:
+            audio_data = b"".join(chunk for chunk in audio_stream if chunk)
+        except Exception as e:
+            print(f"Filler synthesis error: {e}")
+            return None
+        if not audio_data:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(filepath, "wb") as f:
+            f.write(audio_data)
+        return audio_data
+
+    def warm(self, voice_ids: dict, cache_only: bool = False):
+        """
+        Synthesises (or loads from disk) every filler and canned line for each persona.
+        With `cache_only`, only clips already on disk are loaded. Synthesis stops at the first
+        failure, so a bad key costs one upstream call instead of tripping the breaker at startup.
+        Blocking - call from a worker thread.
+        """
+        loaded = 0
+        synthesising = not cache_only
+        for persona_name, voice_id in voice_ids.items():
+            clips = []
+            canned = {}
+            filler_lines = FILLER_LINES.get(persona_name, []) if self.enabled else []
+            for text in filler_lines + CANNED_LINES.get(persona_name, []):
+                audio_data = self._synthesise(text, voice_id, cache_only=not synthesising)
+                if not audio_data:
+                    if synthesising:
+                        print("Filler bank: synthesis failed, loading cached clips only")
+                        synthesising = False
+                    continue
+                if text in filler_lines:
+                    clips.append((text, audio_data))
+                else:
+                    canned[text] = audio_data
+            if clips:
+                self.clips[(persona_name, voice_id)] = clips
+            self.canned[(persona_name, voice_id)] = canned
+            loaded += len(clips) + len(canned)
+
+        print(f"Filler bank ready: {loaded} clips for {len(self.clips)} voices")
+
+    def pick(self, persona_name: str, voice_id: str):
+        """
+        Returns a random (text, audio_bytes) filler for this persona/voice, or None.
+        """
+        if not self.enabled:
+            return None
+        clips = self.clips.get((persona_name, voice_id))
+        if not clips:
+            return None
+        return random.choice(clips)
+
+    def pick_canned(self, persona_name: str, voice_id: str):
+        """
+        Returns a random (text, audio_bytes or None) degraded-mode answer for this persona.
+        Text is always available; audio only if it was pre-synthesised.
+        """
+        lines = CANNED_LINES.get(persona_name) or CANNED_LINES["Joy"]
+        text = random.choice(lines)
+        return text, self.find(persona_name, voice_id, text)
+
+    def find(self, persona_name: str, voice_id: str, text: str):
+        """
+        Returns pre-synthesised audio for an exact filler/canned line, or None.
+        """
+        canned = self.canned.get((persona_name, voice_id), {})
+        if text in canned:
+            return canned[text]
+        for clip_text, audio_data in self.clips.get((persona_name, voice_id), []):
+            if clip_text == text:
+                return audio_data
+        return None
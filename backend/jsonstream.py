@@ -0,0 +1,93 @@
+import json
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON array of objects.
+    Feed it text chunks as they arrive; it returns each top-level object as soon as it closes.
+    Anything outside the array (code fences, chatter) is ignored, and an object that fails
+    to parse is dropped on its own without losing the rest of the array.
+    """
+
+    def __init__(self):
+        self.in_array = False
+        self.depth = 0          # brace depth inside the current item
+        self.in_string = False
+        self.escape = False
+        self.item = []          # characters of the item being collected
+        self.dropped = 0
+
+    def feed(self, text: str) -> list:
+        items = []
+        for ch in text:
+            if not self.in_array:
+                if ch == "[":
+                    self.in_array = True
+                continue
+
+            if self.depth == 0:
+                # Between items: wait for the next object, ignore commas/whitespace
+                if ch == "{":
+                    self.depth = 1
+                    self.item = [ch]
+                elif ch == "]":
+                    self.in_array = False
+                continue
+
+            self.item.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                elif ch == "\n":
+                    # Raw newlines can't appear in JSON strings: the item is garbled, resync
+                    self._drop()
+                continue
+
+            if ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    obj = self._parse("".join(self.item))
+                    self.item = []
+                    if obj is not None:
+                        items.append(obj)
+        return items
+
+    def _parse(self, raw: str):
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            self.dropped += 1
+            return None
+        if not isinstance(obj, dict):
+            self.dropped += 1
+            return None
+        return obj
+
+    def reject(self, item):
+        """
+        Counts a parsed item the caller found invalid (e.g. missing fields) as dropped.
+        """
+        self.dropped += 1
+
+    def _drop(self):
+        self.dropped += 1
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item = []
+
+    def close(self):
+        """
+        Call at end of stream. A truncated trailing item is discarded.
+        """
+        if self.depth:
+            self._drop()
@@ -1,9 +1,14 @@
 import os
 import io
 import json
+import time
+import base64
+import asyncio
+import contextlib
 import urllib.parse
 import re
-from fastapi import FastAPI, HTTPException, Response
+import itertools
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -12,14 +17,48 @@ try:
     from backend.brain import Brain
     from backend.personas import PersonaManager
     from backend.audio import AudioEngine
+    from backend.fillers import FillerBank
+    from backend.voice import VoiceSession
+    from backend.speculation import SpeculationStats
+    from backend.breaker import CircuitOpen
+    from backend.clients import CredentialBindings, current_credentials
+    from backend.sessions import SessionIds
+    from backend.monitor import LoopLagMonitor, sample_stacks, collapsed, top_functions
+    from backend.scheduler import Scheduler, current_session, current_job_class, INTERACTIVE, STREAMING, BACKGROUND, PRIORITIES
 except ModuleNotFoundError:
     from brain import Brain
     from personas import PersonaManager
     from audio import AudioEngine
+    from fillers import FillerBank
+    from voice import VoiceSession
+    from speculation import SpeculationStats
+    from breaker import CircuitOpen
+    from clients import CredentialBindings, current_credentials
+    from sessions import SessionIds
+    from monitor import LoopLagMonitor, sample_stacks, collapsed, top_functions
+    from scheduler import Scheduler, current_session, current_job_class, INTERACTIVE, STREAMING, BACKGROUND, PRIORITIES
 
 load_dotenv()
 
-app = FastAPI(title="Inside Inside Out Console")
+def log_background_failure(task):
+    if not task.cancelled() and task.exception():
+        print(f"Background task failed: {task.exception()!r}")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Synthesise filler clips in the background so startup isn't blocked.
+    # Without a key, only clips already cached on disk are loaded.
+    warm_task = asyncio.create_task(scheduler.run(
+        filler_bank.warm, personas.voice_ids, cache_only=not audio_engine.has_credentials()
+    ))
+    warm_task.add_done_callback(log_background_failure)
+    loop_monitor.start()
+    yield
+    loop_monitor.stop()
+
+
+app = FastAPI(title="Inside Inside Out Console", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,38 +66,175 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Response-Text", "X-Persona"],
+    expose_headers=["X-Response-Text", "X-Persona", "X-Degraded", "X-Session-Id"],
 )
 
 # Initialize Components
-brain = Brain()
+# All upstream (Gemini / ElevenLabs) calls go through one fair scheduler
+scheduler = Scheduler()
+brain = Brain(scheduler=scheduler)
 personas = PersonaManager()
-audio_engine = AudioEngine()
+audio_engine = AudioEngine(scheduler=scheduler)
+session_ids = SessionIds()
+credential_bindings = CredentialBindings()
+filler_bank = FillerBank(audio_engine)
+speculation_stats = SpeculationStats()
+loop_monitor = LoopLagMonitor()
 
 # Global conversation history for context between messages
 # Stores the last N exchanges for context
 conversation_history = []
 MAX_HISTORY = 10  # Keep last 10 exchanges for context
 
+# Scheduler priority class per route; anything not listed (music, SFX) is background.
+# /api/warroom/audio is live playback in the call-mode war room; fun mode demotes its own
+# requests with `X-Priority: streaming`.
+ROUTE_JOB_CLASSES = {
+    "/api/chat": INTERACTIVE,
+    "/api/warroom": INTERACTIVE,
+    "/api/funmode": STREAMING,
+    "/api/funmode/stream": STREAMING,
+    "/api/warroom/audio": INTERACTIVE,
+}
+# X-Priority values clients may use to demote (never promote) a request
+REQUESTED_JOB_CLASSES = {"streaming": STREAMING, "background": BACKGROUND, "prefetch": BACKGROUND}
+
+@app.middleware("http")
+async def bind_scheduling_context(request: Request, call_next):
+    """
+    Tags the request with a session, a priority class and the session's own credentials, if it
+    configured any via /api/config. Sessions are ids this server issued: a request without a valid
+    X-Session-Id is scheduled in a shared per-address bucket and gets a fresh id in its
+    X-Session-Id response header, to send from then on.
+    Clients can demote a request with `X-Priority: streaming`, `background` or `prefetch`.
+    """
+    session_id = request.headers.get("x-session-id")
+    issued = None
+    if not session_ids.verify(session_id):
+        session_id = None
+        issued = session_ids.issue()
+    request.state.session_id = session_id or issued
+    job_class = ROUTE_JOB_CLASSES.get(request.url.path, BACKGROUND)
+    requested = REQUESTED_JOB_CLASSES.get(request.headers.get("x-priority", "").lower())
+    if requested and PRIORITIES[requested] > PRIORITIES[job_class]:
+        job_class = requested
+    # Unverified requests share one bucket per address, so rotating ids buys no extra share
+    current_session.set(session_id or f"anonymous:{request.client.host if request.client else ''}")
+    current_job_class.set(job_class)
+    current_credentials.set(credential_bindings.get(session_id) if session_id else None)
+    response = await call_next(request)
+    if issued:
+        response.headers["X-Session-Id"] = issued
+    return response
+
+
+def ndjson_event(event_type: str, **fields) -> str:
+    return json.dumps({"type": event_type, **fields}) + "\n"
+
+
+def filler_event(persona_name: str):
+    """
+    Returns an NDJSON 'filler' event with a pre-synthesised clip, or None if none is available.
+    """
+    voice_id = personas.get_voice_id(persona_name)
+    clip = filler_bank.pick(persona_name, voice_id)
+    if not clip:
+        return None
+    text, audio_data = clip
+    return ndjson_event(
+        "filler",
+        persona=persona_name,
+        text=text,
+        audio=base64.b64encode(audio_data).decode("ascii")
+    )
+
+
+def degraded_line(persona_name: str):
+    """
+    Canned in-character (text, audio or None) used while Gemini's breaker is open.
+    """
+    return filler_bank.pick_canned(persona_name, personas.get_voice_id(persona_name))
+
+
+def degraded_script(persona_names: list) -> list:
+    return [{"persona": p, "text": degraded_line(p)[0], "degraded": True} for p in persona_names]
+
+
+STREAM_END = object()
+
+
+async def iterate_upstream(iterator):
+    """
+    Async view of a blocking upstream iterator (TTS stream, streamed script): each next() runs on
+    the scheduler's executor instead of Starlette's shared threadpool, see Scheduler.run().
+    """
+    iterator = iter(iterator)
+    while True:
+        item = await scheduler.run(next, iterator, STREAM_END)
+        if item is STREAM_END:
+            return
+        yield item
+
+
+async def start_audio_stream(audio_stream):
+    """
+    Waits (on the scheduler's executor) for the first TTS chunk and returns an iterator over the whole
+    stream, or None if the upstream refused or failed before any audio. Callers can then still
+    choose a fallback before response headers are sent.
+    """
+    if not audio_stream:
+        return None
+    audio_iter = iter(audio_stream)
+    try:
+        first_chunk = await scheduler.run(next, audio_iter, None)
+    except Exception as e:
+        print(f"TTS Error: {e}")
+        return None
+    if not first_chunk:
+        return None
+    return itertools.chain([first_chunk], audio_iter)
+
+
+async def await_with_filler(task, persona_name: str, started: float):
+    """
+    Waits for `task`, yielding a filler event first if it isn't done within the threshold.
+    The threshold is measured from `started` so routing time counts against it.
+    """
+    remaining = filler_bank.threshold - (time.monotonic() - started)
+    done, _ = await asyncio.wait({task}, timeout=max(remaining, 0))
+    if not done:
+        event = filler_event(persona_name)
+        if event:
+            yield event
+
+
 @app.get("/")
 def read_root():
     return {"status": "Inside Inside Out HQ is Online"}
 
 @app.post("/api/config")
-async def config_endpoint(data: dict):
+async def config_endpoint(data: dict, request: Request):
     """
     Configure API keys dynamically (Judge Mode).
+    Keys are bound to the caller's issued session id (returned here too) and served from pooled
+    clients, so concurrent judges with different keys never overwrite each other. Send the id as
+    X-Session-Id on every request, and as ?session= on /ws/voice.
     """
     gemini_key = data.get("gemini_key")
     eleven_key = data.get("eleven_key")
-    
-    if gemini_key:
-        brain.configure(gemini_key)
-    
-    if eleven_key:
-        audio_engine.configure(eleven_key)
+    session_id = request.state.session_id
+
+    try:
+        if gemini_key:
+            brain.register_key(gemini_key)
+        if eleven_key:
+            audio_engine.register_key(eleven_key)
+        credential_bindings.bind(session_id, gemini=gemini_key, elevenlabs=eleven_key)
+    except Exception as e:
+        print(f"Config error: {e}")
+        raise HTTPException(status_code=400, detail="Invalid API key")
         
-    return {"status": "configured"}
+    return {"status": "configured", "session_id": session_id}
 
 
 @app.get("/api/scribe-token")
@@ -69,7 +245,7 @@ async def scribe_token_endpoint():
     """
     import httpx
     
-    api_key = os.getenv("ELEVENLABS_API_KEY")
+    api_key = audio_engine.current_api_key()
     if not api_key:
         raise HTTPException(status_code=500, detail="ElevenLabs API key not configured")
     
@@ -96,10 +272,17 @@ async def chat_endpoint(data: dict):
 
     # 1. Auto-Detect Persona if requested
     auto_detect = data.get("auto_detect", False)
+
+    if data.get("stream"):
+        # NDJSON event stream: optional filler clip, then text, then audio chunks
+        return StreamingResponse(
+            chat_event_stream(user_message, persona_name, auto_detect),
+            media_type="application/x-ndjson"
+        )
     
     if auto_detect:
         # Ask Brain who should handle this
-        detected_name = brain.decide_persona(user_message)
+        detected_name = await scheduler.run(brain.decide_persona, user_message)
         print(f"Router decided: {detected_name}")
         persona_name = detected_name
     else:
@@ -112,12 +295,32 @@ async def chat_endpoint(data: dict):
         # Fallback if name mismatch
         system_prompt = f"You are {persona_name}."
 
-    # 2. Vertex AI Generation
-    response_text = brain.generate_response(user_message, system_instruction=system_prompt)
+    # 2. Vertex AI Generation (on the scheduler's executor so queueing for upstream capacity doesn't block the loop)
+    response_text = None
+    if not brain.breaker.is_open:
+        try:
+            response_text = await scheduler.run(brain.generate_response, user_message, system_instruction=system_prompt)
+        except CircuitOpen:
+            pass  # Another request holds the half-open probe
+
+    # Degraded mode: Gemini is down, answer instantly with a canned line instead of waiting to time out
+    if response_text is None:
+        response_text, canned_audio = degraded_line(persona_name)
+        if canned_audio:
+            return StreamingResponse(
+                io.BytesIO(canned_audio),
+                media_type="audio/mpeg",
+                headers={
+                    "X-Response-Text": urllib.parse.quote(response_text),
+                    "X-Persona": persona_name,
+                    "X-Degraded": "true"
+                }
+            )
+        return {"persona": persona_name, "text": response_text, "audio": None, "degraded": True}
     
-    # 3. Audio Generation (ElevenLabs)
+    # 3. Audio Generation (ElevenLabs), started before headers go out so a failure can still fall back
     voice_id = personas.get_voice_id(persona_name)
-    audio_stream_iterator = audio_engine.generate_speech_stream(response_text, voice_id)
+    audio_stream_iterator = await start_audio_stream(audio_engine.generate_speech_stream(response_text, voice_id))
 
     # We return a custom response structure. 
     # Ideally, we stream audio. For simplicity in this hackathon setup:
@@ -131,14 +334,11 @@ async def chat_endpoint(data: dict):
     # This makes the frontend audio player happy.
     
     if audio_stream_iterator:
-        def iter_audio():
-            yield from audio_stream_iterator
-
         # Header values must be Latin-1, so we URL-encode the text (which may have emojis)
         safe_text = urllib.parse.quote(response_text.replace("\n", " ")[:500])
 
         return StreamingResponse(
-            iter_audio(), 
+            iterate_upstream(audio_stream_iterator),
             media_type="audio/mpeg",
             headers={
                 "X-Response-Text": safe_text,
@@ -146,13 +346,69 @@ async def chat_endpoint(data: dict):
             } 
         )
     else:
-        # Fallback if audio fails
+        # Fallback if audio fails (text-only, immediate when ElevenLabs' breaker is open)
         return {
             "persona": persona_name,
             "text": response_text,
-            "audio": None
+            "audio": None,
+            "degraded": audio_engine.breaker.is_open
         }
 
+async def chat_event_stream(user_message: str, persona_name: str, auto_detect: bool):
+    """
+    Streaming variant of /api/chat.
+    Emits a persona filler immediately if the real audio is slow, then the real answer.
+    """
+    started = time.monotonic()
+
+    if auto_detect:
+        persona_name = await scheduler.run(brain.decide_persona, user_message)
+        print(f"Router decided: {persona_name}")
+
+    system_prompt = personas.get_prompt(persona_name)
+    if not system_prompt:
+        system_prompt = f"You are {persona_name}."
+    voice_id = personas.get_voice_id(persona_name)
+
+    def generate_until_first_audio():
+        # Runs in a worker thread: text generation, then wait for the first TTS chunk
+        response_text = None
+        if not brain.breaker.is_open:
+            try:
+                response_text = brain.generate_response(user_message, system_instruction=system_prompt)
+            except CircuitOpen:
+                pass  # Another request holds the half-open probe
+        if response_text is None:
+            response_text, canned_audio = degraded_line(persona_name)
+            return response_text, canned_audio, iter(())
+        audio_stream = audio_engine.generate_speech_stream(response_text, voice_id)
+        if not audio_stream:
+            return response_text, None, None
+        try:
+            audio_iter = iter(audio_stream)
+            return response_text, next(audio_iter, None), audio_iter
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            return response_text, None, None
+
+    task = asyncio.create_task(scheduler.run(generate_until_first_audio))
+    async for event in await_with_filler(task, persona_name, started):
+        yield event
+
+    response_text, first_chunk, audio_iter = await task
+    yield ndjson_event("text", persona=persona_name, text=response_text)
+
+    chunk = first_chunk
+    while chunk:
+        yield ndjson_event("audio", persona=persona_name, audio=base64.b64encode(chunk).decode("ascii"))
+        try:
+            chunk = await scheduler.run(next, audio_iter, None)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            break
+
+    yield ndjson_event("done")
+
 @app.get("/api/music")
 async def music_endpoint(emotion: str):
     """
@@ -176,7 +432,7 @@ async def music_endpoint(emotion: str):
     # Let's try to use that for short loops or see if we can use the proper music endpoint.
     # I'll stick to `generate_sfx` for now as "Music Loop".
     
-    sfx_response = audio_engine.generate_sfx(prompt)
+    sfx_response = await scheduler.run(audio_engine.generate_sfx, prompt)
     if sfx_response:
         # returns valid audio bytes/generator
         return StreamingResponse(io.BytesIO(sfx_response), media_type="audio/mpeg")
@@ -185,50 +441,49 @@ async def music_endpoint(emotion: str):
 
 @app.post("/api/funmode")
 async def fun_mode_endpoint(data: dict):
+    """
+    Streams the Fun Mode script as NDJSON, one {"persona", "text"} object per line,
+    each sent as soon as the model closes it.
+    """
     topic = data.get("topic", "Life")
-    script = brain.generate_fun_mode_script(topic)
-    return {"script": script}
+
+    def iter_script():
+        try:
+            if not brain.breaker.is_open:
+                for line in brain.generate_fun_mode_script_stream(topic):
+                    yield json.dumps(line) + "\n"
+                return
+        except CircuitOpen:
+            pass  # Another request holds the half-open probe
+        yield from (json.dumps(line) + "\n" for line in degraded_script(["Joy", "Anger", "Disgust"]))
+
+    return StreamingResponse(iterate_upstream(iter_script()), media_type="application/x-ndjson")
 
 @app.get("/api/sfx/{event_type}")
 async def sfx_endpoint(event_type: str):
-    sfx_response = audio_engine.generate_sfx(event_type)
+    sfx_response = await scheduler.run(audio_engine.generate_sfx, event_type)
     if sfx_response:
         return StreamingResponse(io.BytesIO(sfx_response), media_type="audio/mpeg")
     return {"status": "error"}
 
 
-@app.post("/api/warroom")
-async def warroom_endpoint(data: dict):
+def resolve_speaker_order(user_message: str, data: dict) -> list:
     """
-    Multi-agent war room: All emotions react to the user's input,
-    aware of each other's responses.
-    Returns a JSON list of {persona, text} for the frontend to play sequentially.
+    Determine speaker order based on priority:
+    1. Mentioned via @Name
+    2. Selected personas from UI (multi-select)
+    3. Target persona (single override)
+    4. Auto-orchestration (default)
     """
-    user_message = data.get("message")
     target_persona = data.get("target_persona")
+    valid_personas = ["Joy", "Sadness", "Anger", "Fear", "Disgust"]
+    speaker_order = []
 
-    if not user_message:
-        raise HTTPException(status_code=400, detail="Message required")
-    
-    # Access global conversation history
-    global conversation_history
-    
     # Include previous exchanges for context in orchestrator
     history_summary = ""
     if conversation_history:
         history_summary = "Previous context: " + " | ".join(conversation_history[-4:])
     
-    speaker_order = []
-    
-    # Determine speaker order based on priority:
-    # 1. Mentioned via @Name
-    # 2. Selected personas from UI (multi-select)
-    # 3. Target persona (single override)
-    # 4. Auto-orchestration (default)
-    
-    valid_personas = ["Joy", "Sadness", "Anger", "Fear", "Disgust"]
-    speaker_order = []
-    
     # Check for @Mentions
     mentions = re.findall(r"@(\w+)", user_message)
     mentioned_order = [m for m in mentions if m in valid_personas]
@@ -268,10 +523,7 @@ async def warroom_endpoint(data: dict):
         """
         
         try:
-            order_response = brain.client.models.generate_content(
-                model="gemini-2.5-flash-lite",
-                contents=orchestrator_prompt
-            )
+            order_response = brain.generate("orchestrator", orchestrator_prompt)
             order_text = order_response.text.strip().replace(".", "")
             speaker_order = [n.strip() for n in order_text.split(",") if n.strip() in valid_personas]
             if len(speaker_order) == 0:
@@ -279,10 +531,17 @@ async def warroom_endpoint(data: dict):
         except Exception as e:
             print(f"Orchestrator error: {e}")
             speaker_order = ["Joy", "Sadness"]
-    
-    # Build tasks for parallel generation
-    import asyncio
-    
+
+    return speaker_order
+
+
+async def generate_warroom_responses(user_message: str, speaker_order: list) -> list:
+    """
+    Generates one line per speaker in parallel and returns a list of {persona, text}.
+    """
+    if brain.breaker.is_open:
+        return degraded_script(speaker_order[:4])
+
     # Context aggregation
     history_context = ""
     if conversation_history:
@@ -315,10 +574,16 @@ async def warroom_endpoint(data: dict):
         tasks.append(brain.generate_response_async(user_message, system_instruction=full_prompt))
 
     # Run everything in parallel
-    results = await asyncio.gather(*tasks)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
     
     responses = []
     for i, persona_name in enumerate(speaker_order[:4]):
+        if isinstance(results[i], CircuitOpen):
+            # Another request holds the half-open probe: canned line rather than a placeholder
+            responses.append({"persona": persona_name, "text": degraded_line(persona_name)[0], "degraded": True})
+            continue
+        if isinstance(results[i], BaseException):
+            raise results[i]
         response_text = results[i].strip()
         
         # Cleanup
@@ -329,18 +594,70 @@ async def warroom_endpoint(data: dict):
             "persona": persona_name,
             "text": response_text
         })
-    
-    # Save to history
+
+    return responses
+
+
+def remember_exchange(user_message: str, responses: list):
+    global conversation_history
+
     conversation_history.append(f"User: {user_message}")
     for r in responses:
         conversation_history.append(f"{r['persona']}: {r['text']}")
     
     if len(conversation_history) > MAX_HISTORY * 3:
         conversation_history = conversation_history[-MAX_HISTORY * 3:]
+
+
+@app.post("/api/warroom")
+async def warroom_endpoint(data: dict):
+    """
+    Multi-agent war room: All emotions react to the user's input,
+    aware of each other's responses.
+    Returns a JSON list of {persona, text} for the frontend to play sequentially.
+    With "stream": true, returns NDJSON events instead (filler, response..., done).
+    """
+    user_message = data.get("message")
+
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message required")
+
+    if data.get("stream"):
+        return StreamingResponse(
+            warroom_event_stream(user_message, data),
+            media_type="application/x-ndjson"
+        )
+    
+    speaker_order = await scheduler.run(resolve_speaker_order, user_message, data)
+    responses = await generate_warroom_responses(user_message, speaker_order)
+    
+    # Save to history
+    remember_exchange(user_message, responses)
     
     return {"responses": responses}
 
 
+async def warroom_event_stream(user_message: str, data: dict):
+    """
+    Streaming variant of /api/warroom.
+    Emits a filler from the first speaker if the lines take longer than the threshold.
+    """
+    started = time.monotonic()
+    speaker_order = await scheduler.run(resolve_speaker_order, user_message, data)
+
+    task = asyncio.create_task(generate_warroom_responses(user_message, speaker_order))
+    if speaker_order:
+        async for event in await_with_filler(task, speaker_order[0], started):
+            yield event
+
+    responses = await task
+    remember_exchange(user_message, responses)
+
+    for r in responses:
+        yield ndjson_event("response", persona=r["persona"], text=r["text"])
+    yield ndjson_event("done")
+
+
 
 
 @app.post("/api/funmode/stream")
@@ -363,11 +680,13 @@ async def fun_mode_stream_endpoint(data: dict):
 
     # Define constraints based on target selection or mode
     valid_personas = ["Joy", "Sadness", "Anger", "Fear", "Disgust"]
+    debate_personas = ["Joy", "Anger", "Disgust"]  # Who speaks in degraded mode
     
     if target_personas and isinstance(target_personas, list) and len(target_personas) > 0:
         # User has selected specific personas - ONLY use those
         selected = [p for p in target_personas if p in valid_personas]
         if selected:
+            debate_personas = selected
             persona_list = ", ".join(selected)
             constraints = f"ONLY involve these emotions: {persona_list}. They are the ONLY ones who should speak. Create a dynamic discussion with {len(selected)} emotion(s) - about 3-5 turns total."
         else:
@@ -455,12 +774,12 @@ async def fun_mode_stream_endpoint(data: dict):
     # We'll define the logic inline with a mutable buffer
     def stream_with_buffer():
         buffer = ""
+        if brain.breaker.is_open:
+            for line in degraded_script(debate_personas):
+                yield json.dumps(line) + "\n"
+            return
         try:
-            response = brain.client.models.generate_content_stream(
-                model="gemini-2.5-flash-lite",
-                contents=script_prompt
-            )
-            for chunk in response:
+            for chunk in brain.generate_stream("debate", script_prompt):
                 if not chunk.text: continue
                 buffer += chunk.text
                 while "\n" in buffer:
@@ -480,11 +799,15 @@ async def fun_mode_stream_endpoint(data: dict):
                 msg = parts[1].strip()
                 if name in ["Joy", "Sadness", "Anger", "Fear", "Disgust", "Headquarters"]:
                     yield json.dumps({"persona": name, "text": msg}) + "\n"
+        except CircuitOpen:
+            # Another request holds the half-open probe; raised before any line was sent
+            for line in degraded_script(debate_personas):
+                yield json.dumps(line) + "\n"
         except Exception as e:
             print(f"Stream error: {e}")
             yield json.dumps({"persona": "System", "text": "Connection interrupted: " + str(e)}) + "\n"
 
-    return StreamingResponse(stream_with_buffer(), media_type="application/x-ndjson")
+    return StreamingResponse(iterate_upstream(stream_with_buffer()), media_type="application/x-ndjson")
 
 @app.get("/api/warroom/audio")
 @app.post("/api/warroom/audio")
@@ -503,20 +826,196 @@ async def warroom_audio_endpoint(data: dict = None, persona: str = None, text: s
         raise HTTPException(status_code=400, detail="Text required")
     
     voice_id = personas.get_voice_id(persona_name)
-    audio_stream = audio_engine.generate_speech_stream(text_content, voice_id)
+    safe_text = urllib.parse.quote(text_content.replace("\n", " ")[:500])
+
+    # Canned/filler lines (e.g. from degraded mode) are already synthesised
+    canned_audio = filler_bank.find(persona_name, voice_id, text_content)
+    if canned_audio:
+        return StreamingResponse(
+            io.BytesIO(canned_audio),
+            media_type="audio/mpeg",
+            headers={"X-Response-Text": safe_text, "X-Persona": persona_name}
+        )
+
+    audio_stream = await start_audio_stream(audio_engine.generate_speech_stream(text_content, voice_id))
     
     if audio_stream:
-        def iter_audio():
-            yield from audio_stream
-        
-        safe_text = urllib.parse.quote(text_content.replace("\n", " ")[:500])
         return StreamingResponse(
-            iter_audio(),
+            iterate_upstream(audio_stream),
             media_type="audio/mpeg",
             headers={
                 "X-Response-Text": safe_text,
                 "X-Persona": persona_name
             }
         )
+
+    if audio_engine.breaker.is_open:
+        # Text-only: the client shows the line without waiting for audio
+        return {"status": "degraded", "persona": persona_name, "text": text_content}
     
     return {"status": "error"}
+
+
+async def draft_voice_turn(user_message: str, options: dict) -> list:
+    """
+    Routing + persona generation for a voice turn, without side effects.
+    Safe to run speculatively on a partial transcript.
+    """
+    speaker_order = await scheduler.run(resolve_speaker_order, user_message, options)
+    return await generate_warroom_responses(user_message, speaker_order)
+
+
+async def voice_turn_events(user_message: str, options: dict, responses: list = None):
+    """
+    One voice turn for /ws/voice: war room lines, then TTS audio for each line in order.
+    `responses` is a committed speculative draft, if any.
+    Yields text event frames and binary audio frames.
+    """
+    if responses is None:
+        started = time.monotonic()
+        speaker_order = await scheduler.run(resolve_speaker_order, user_message, options)
+
+        task = asyncio.create_task(generate_warroom_responses(user_message, speaker_order))
+        try:
+            if speaker_order:
+                async for event in await_with_filler(task, speaker_order[0], started):
+                    yield event
+            responses = await task
+        finally:
+            task.cancel()
+    remember_exchange(user_message, responses)
+
+    for r in responses:
+        yield ndjson_event("response", persona=r["persona"], text=r["text"])
+
+    for index, r in enumerate(responses):
+        voice_id = personas.get_voice_id(r["persona"])
+        audio_stream = await start_audio_stream(
+            await scheduler.run(audio_engine.generate_speech_stream, r["text"], voice_id)
+        )
+        if not audio_stream:
+            canned_audio = filler_bank.find(r["persona"], voice_id, r["text"])
+            if not canned_audio:
+                continue
+            audio_stream = [canned_audio]
+        yield ndjson_event("audio_start", persona=r["persona"], index=index)
+        audio_iter = iter(audio_stream)
+        while True:
+            try:
+                chunk = await scheduler.run(next, audio_iter, None)
+            except Exception as e:
+                print(f"TTS Error: {e}")
+                break
+            if not chunk:
+                break
+            yield chunk
+        yield ndjson_event("audio_end", persona=r["persona"], index=index)
+
+
+@app.websocket("/ws/voice")
+async def voice_session_endpoint(websocket: WebSocket):
+    """
+    Persistent full-duplex voice session: mic audio up, transcripts + persona text + TTS audio down.
+    User speech cancels in-flight generation and playback (barge-in). See VoiceSession for the protocol.
+    """
+    session_id = websocket.query_params.get("session")
+    if not session_ids.verify(session_id):
+        session_id = None
+    current_session.set(session_id or f"ws:{id(websocket)}")
+    current_job_class.set(INTERACTIVE)
+    current_credentials.set(credential_bindings.get(session_id) if session_id else None)
+    session = VoiceSession(
+        websocket,
+        voice_turn_events,
+        scribe_api_key=audio_engine.current_api_key(),
+        draft=draft_voice_turn,
+        speculation_stats=speculation_stats
+    )
+    await session.run()
+
+
+@app.get("/api/speculation/stats")
+async def speculation_stats_endpoint():
+    """
+    Commit/abort rates and latency saved by speculative generation on partial transcripts.
+    """
+    return speculation_stats.snapshot()
+
+
+@app.get("/api/scheduler/stats")
+async def scheduler_stats_endpoint():
+    """
+    Upstream scheduler state: active jobs, queue depth and queue-time percentiles per priority class.
+    """
+    return scheduler.snapshot()
+
+
+@app.get("/api/health")
+async def health_endpoint():
+    """
+    Upstream circuit breaker state. "degraded" is true while any upstream is being bypassed.
+    """
+    # Breakers are per credential: this reports the ones serving the caller's session
+    upstreams = {
+        "gemini": brain.breaker.snapshot(),
+        "elevenlabs": audio_engine.breaker.snapshot(),
+    }
+    return {
+        "status": "ok",
+        "degraded": any(u["state"] != "closed" for u in upstreams.values()),
+        "upstreams": upstreams,
+        "client_pools": {
+            "gemini": brain.pool.snapshot(),
+            "elevenlabs": audio_engine.pool.snapshot(),
+        },
+    }
+
+
+def require_admin(request: Request):
+    """
+    Admin endpoints are disabled unless ADMIN_TOKEN is set, and then require it in X-Admin-Token.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints disabled")
+    if request.headers.get("x-admin-token") != admin_token:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/api/admin/loop")
+async def loop_lag_endpoint(request: Request):
+    """
+    Event loop lag monitor: stall count, worst lag and the stack of the most recent stall.
+    """
+    require_admin(request)
+    return loop_monitor.snapshot()
+
+
+@app.get("/api/admin/profile")
+async def profile_endpoint(request: Request, seconds: float = 5.0, interval_ms: float = 5.0, format: str = "collapsed"):
+    """
+    Time-boxed sampling profile of the live process (all threads, including the event loop).
+    format=collapsed returns flamegraph.pl / speedscope input; format=json returns the top functions.
+    """
+    require_admin(request)
+    seconds = min(max(seconds, 0.1), 60.0)
+    interval = min(max(interval_ms, 1.0), 100.0) / 1000
+
+    # Sample from a worker thread so the loop keeps serving (and shows up in the profile)
+    counts = await asyncio.to_thread(sample_stacks, seconds, interval)
+
+    if format == "json":
+        return {
+            "seconds": seconds,
+            "samples": sum(counts.values()),
+            "top": top_functions(counts),
+        }
+    return Response(collapsed(counts), media_type="text/plain")
+
+
+@app.get("/api/models/stats")
+async def model_stats_endpoint():
+    """
+    Model tiering: active tier per call type, plus observed p95 latency and token usage per model.
+    """
+    return brain.models.snapshot()
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+# Each Brain call type maps to a primary tier and an optional faster fallback tier.
+# Override any part with MODEL_TIERS (inline JSON) or MODEL_TIERS_FILE (path to JSON), same shape.
+DEFAULT_CONFIG = {
+    "tiers": {
+        "routing": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 16, "thinking_budget": 0, "timeout_ms": 4000},
+        "quip": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 160, "thinking_budget": 0, "timeout_ms": 8000},
+        "script": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 2048, "thinking_budget": 0, "timeout_ms": 30000},
+        "routing_fast": {"model": "gemini-2.0-flash-lite", "max_output_tokens": 16, "thinking_budget": None, "timeout_ms": 3000},
+        "quip_fast": {"model": "gemini-2.0-flash-lite", "max_output_tokens": 120, "thinking_budget": None, "timeout_ms": 6000},
+        "script_fast": {"model": "gemini-2.0-flash-lite", "max_output_tokens": 1536, "thinking_budget": None, "timeout_ms": 20000},
+    },
+    "calls": {
+        # p95_budget_ms: time-to-first-chunk for streams, full latency otherwise
+        "routing": {"tier": "routing", "fallback": "routing_fast", "p95_budget_ms": 1200},
+        "orchestrator": {"tier": "routing", "fallback": "routing_fast", "p95_budget_ms": 1500},
+        "persona": {"tier": "quip", "fallback": "quip_fast", "p95_budget_ms": 2500},
+        "script": {"tier": "script", "fallback": "script_fast", "p95_budget_ms": 2000},
+        "debate": {"tier": "script", "fallback": "script_fast", "p95_budget_ms": 1500},
+    },
+    "latency_window_s": 300,
+    "min_samples": 5,
+}
+
+
+def load_config() -> dict:
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    override = None
+    path = os.getenv("MODEL_TIERS_FILE")
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            override = json.load(f)
+    elif os.getenv("MODEL_TIERS"):
+        override = json.loads(os.getenv("MODEL_TIERS"))
+    if override:
+        for section in ("tiers", "calls"):
+            for name, values in override.get(section, {}).items():
+                config[section].setdefault(name, {}).update(values)
+        for key in ("latency_window_s", "min_samples"):
+            if key in override:
+                config[key] = override[key]
+    return config
+
+
+class Tier:
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.model = spec["model"]
+        self.max_output_tokens = spec.get("max_output_tokens")
+        self.thinking_budget = spec.get("thinking_budget")
+        self.timeout_ms = spec.get("timeout_ms")
+
+    def config(self, system_instruction: str = None) -> dict:
+        """
+        GenerateContentConfig (as a dict) for this tier.
+        """
+        config = {}
+        if system_instruction:
+            config["system_instruction"] = system_instruction
+        if self.max_output_tokens:
+            config["max_output_tokens"] = self.max_output_tokens
+        if self.thinking_budget is not None:
+            config["thinking_config"] = {"thinking_budget": self.thinking_budget}
+        if self.timeout_ms:
+            config["http_options"] = {"timeout": self.timeout_ms}
+        return config
+
+
+class _ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.thinking_tokens = 0
+
+
+class ModelTiers:
+    """
+    Picks the model tier for each Brain call type and tracks observed latency and token usage
+    per model. When a primary model's recent p95 for a call type exceeds that call's budget,
+    it fails over to the faster fallback tier until the slow samples age out of the window.
+    Latency is tracked per (model, call type) since a routing call and a script aren't comparable.
+    With `pin_primary` failover is disabled (latency is still recorded): cassette keys include the
+    model and tier config, so switching tiers mid-run would turn every later call into a miss.
+    """
+
+    def __init__(self, pin_primary: bool = False):
+        self.pin_primary = pin_primary
+        config = load_config()
+        self.tiers = {name: Tier(name, spec) for name, spec in config["tiers"].items()}
+        self.calls = config["calls"]
+        self.window = config["latency_window_s"]
+        self.min_samples = config["min_samples"]
+        self.lock = threading.Lock()
+        self.stats = {}  # model -> _ModelStats
+        self.latencies = {}  # (model, call_type) -> deque of (timestamp, seconds)
+        self.failed_over = set()
+
+    def _stats(self, model: str) -> _ModelStats:
+        if model not in self.stats:
+            self.stats[model] = _ModelStats()
+        return self.stats[model]
+
+    def _p95(self, model: str, call_type: str):
+        # Caller holds self.lock
+        latencies = self.latencies.get((model, call_type))
+        if not latencies:
+            return None
+        cutoff = time.monotonic() - self.window
+        while latencies and latencies[0][0] < cutoff:
+            latencies.popleft()
+        if len(latencies) < self.min_samples:
+            return None
+        samples = sorted(s for _, s in latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def select(self, call_type: str) -> Tier:
+        route = self.calls[call_type]
+        primary = self.tiers[route["tier"]]
+        fallback = self.tiers.get(route.get("fallback"))
+        if not fallback or self.pin_primary:
+            return primary
+
+        with self.lock:
+            p95 = self._p95(primary.model, call_type)
+            over_budget = p95 is not None and p95 * 1000 > route["p95_budget_ms"]
+            if over_budget != (call_type in self.failed_over):
+                if over_budget:
+                    self.failed_over.add(call_type)
+                    print(f"Model tiering: {call_type} -> {fallback.model} (p95 {p95 * 1000:.0f}ms over budget)")
+                else:
+                    self.failed_over.discard(call_type)
+                    print(f"Model tiering: {call_type} back on {primary.model}")
+        return fallback if over_budget else primary
+
+    def record(self, model: str, call_type: str, seconds: float, usage=None):
+        with self.lock:
+            stats = self._stats(model)
+            stats.calls += 1
+            self.latencies.setdefault((model, call_type), deque()).append((time.monotonic(), seconds))
+            if usage:
+                stats.prompt_tokens += getattr(usage, "prompt_token_count", None) or 0
+                stats.output_tokens += getattr(usage, "candidates_token_count", None) or 0
+                stats.thinking_tokens += getattr(usage, "thoughts_token_count", None) or 0
+
+    def record_error(self, model: str):
+        with self.lock:
+            stats = self._stats(model)
+            stats.calls += 1
+            stats.errors += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            models = {}
+            for model, stats in self.stats.items():
+                p95s = {call_type: self._p95(m, call_type) for m, call_type in list(self.latencies) if m == model}
+                models[model] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "p95_ms": {call_type: round(p95 * 1000) for call_type, p95 in p95s.items() if p95 is not None},
+                    "prompt_tokens": stats.prompt_tokens,
+                    "output_tokens": stats.output_tokens,
+                    "thinking_tokens": stats.thinking_tokens,
+                }
+            return {
+                "pinned_to_primary": self.pin_primary,
+                "calls": {
+                    call_type: {**route, "active_tier": route.get("fallback") if call_type in self.failed_over else route["tier"]}
+                    for call_type, route in self.calls.items()
+                },
+                "models": models,
+            }
@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter
+
+
+class LoopLagMonitor:
+    """
+    Detects anything blocking the event loop (sync SDK calls or file I/O inside async handlers).
+
+    A heartbeat task ticks on the loop; a watchdog thread notices when the heartbeat is late by
+    more than `threshold` and logs the loop thread's current stack, i.e. the code doing the blocking.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() != "false"
+        self.threshold = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200")) / 1000
+        self.interval = min(0.05, self.threshold / 4)
+        self.loop_thread_id = None
+        self.last_beat = time.monotonic()
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.last_stall = None
+        self.heartbeat = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """
+        Call from inside the running event loop.
+        """
+        if not self.enabled or self.heartbeat:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.heartbeat = asyncio.get_running_loop().create_task(self._beat())
+        threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True).start()
+        print(f"Loop lag monitor active (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.heartbeat:
+            self.heartbeat.cancel()
+            self.heartbeat = None
+
+    async def _beat(self):
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self.stop_event.wait(self.interval):
+            beat = self.last_beat
+            lag = time.monotonic() - beat
+            if lag < self.threshold:
+                continue
+            self.max_lag = max(self.max_lag, lag)
+            if reported_beat == beat:
+                continue  # Same stall, already logged
+            reported_beat = beat
+            self.stalls += 1
+
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(no frame)\n"
+            self.last_stall = {"at": time.time(), "lag_ms": round(lag * 1000), "stack": stack}
+            print(f"Event loop blocked for >{lag * 1000:.0f}ms. Blocking stack:\n{stack}")
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": round(self.threshold * 1000),
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000),
+            "current_lag_ms": round((time.monotonic() - self.last_beat) * 1000) if self.heartbeat else None,
+            "last_stall": self.last_stall,
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """
+    Samples every thread's stack for `seconds` and returns collapsed-stack counts
+    ("thread;outer;...;inner" -> samples), the input format of flamegraph.pl and speedscope.
+    Blocking - run in a worker thread.
+    """
+    own_id = threading.get_ident()
+    names = {}
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if thread_id not in names:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+def top_functions(counts: Counter, limit: int = 30) -> list:
+    """
+    Per-function self/total sample counts, for a quick look without a flamegraph viewer.
+    """
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, n in counts.items():
+        frames = stack.split(";")[1:]  # Drop thread name
+        if not frames:
+            continue
+        self_counts[frames[-1]] += n
+        for label in set(frames):
+            total_counts[label] += n
+    return [
+        {"function": label, "self": self_counts[label], "total": total}
+        for label, total in total_counts.most_common(limit)
+    ]
@@ -0,0 +1,306 @@
+import os
+import time
+import heapq
+import asyncio
+import threading
+import functools
+import itertools
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+
+# Priority classes, highest first
+INTERACTIVE = "interactive"   # /api/chat, /api/warroom, voice turns
+STREAMING = "streaming"       # debate lines and their TTS
+BACKGROUND = "background"     # prefetch, warm-up, music/SFX
+PRIORITIES = {INTERACTIVE: 0, STREAMING: 1, BACKGROUND: 2}
+
+DEFAULT_DEADLINES_MS = {INTERACTIVE: 10000, STREAMING: 20000, BACKGROUND: 60000}
+
+# Set per request by main.py; work started outside a request (startup warm-up) is background
+current_session = contextvars.ContextVar("current_session", default="system")
+current_job_class = contextvars.ContextVar("current_job_class", default=BACKGROUND)
+
+
+def parse_weights(spec: str) -> dict:
+    """
+    "session=weight,session=weight" -> {session: weight}
+    """
+    weights = {}
+    for item in spec.split(","):
+        if "=" in item:
+            session, weight = item.rsplit("=", 1)
+            weights[session.strip()] = float(weight)
+    return weights
+
+
+class SchedulerTimeout(Exception):
+    """
+    Raised when a job waits in the queue longer than its class deadline.
+    """
+
+
+class SchedulerFull(SchedulerTimeout):
+    """
+    Raised immediately when SCHED_MAX_QUEUED jobs are already waiting.
+    """
+
+
+class _Ticket:
+    __slots__ = ("session", "job_class", "start_tag", "enqueued", "granted", "abandoned", "on_grant")
+
+    def __init__(self, session, job_class, start_tag, on_grant):
+        self.session = session
+        self.job_class = job_class
+        self.start_tag = start_tag
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.abandoned = False
+        self.on_grant = on_grant
+
+
+class _ClassMetrics:
+    def __init__(self):
+        self.granted = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.waits = deque(maxlen=500)
+
+    def snapshot(self) -> dict:
+        waits = sorted(self.waits)
+        return {
+            "granted": self.granted,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else None,
+            "max_wait_ms": round(waits[-1] * 1000, 1) if waits else None,
+        }
+
+
+class Scheduler:
+    """
+    Admission control for upstream (Gemini / ElevenLabs) calls.
+
+    At most `capacity` jobs run at once. Waiting jobs are served strictly by priority class,
+    and within a class by weighted fair queuing across sessions (start-time fair queuing),
+    so one session's long debate can't starve everyone else. No session may hold more than
+    SCHED_SESSION_MAX_ACTIVE slots at once, and SCHED_INTERACTIVE_RESERVE slots are kept for
+    interactive jobs, so a burst of debate TTS can't fill the pool. A session with weight 2 gets twice
+    the share of a weight-1 session while both are backlogged (SCHED_SESSION_WEIGHTS or
+    set_weight(); SCHED_DEFAULT_WEIGHT otherwise). Each class has a queue deadline.
+    Usable from both worker threads (`slot`) and the event loop (`aslot`).
+
+    Blocking upstream work must run via `run()`, on the scheduler's own executor, never on the
+    default pool: a thread waiting in slot() must not take the thread a slot holder needs to read
+    its next chunk. The queue is bounded (SCHED_MAX_QUEUED) and the executor has one thread per
+    slot plus one per queue entry, so holders can always make progress.
+    """
+
+    def __init__(self):
+        self.capacity = int(os.getenv("UPSTREAM_CONCURRENCY", "8"))
+        self.deadlines = {
+            job_class: float(os.getenv(f"SCHED_DEADLINE_{job_class.upper()}_MS", default)) / 1000
+            for job_class, default in DEFAULT_DEADLINES_MS.items()
+        }
+        self.default_weight = float(os.getenv("SCHED_DEFAULT_WEIGHT", "1"))
+        self.session_weights = parse_weights(os.getenv("SCHED_SESSION_WEIGHTS", ""))
+        self.max_queued = int(os.getenv("SCHED_MAX_QUEUED", "32"))
+        self.session_max_active = max(1, int(os.getenv("SCHED_SESSION_MAX_ACTIVE", str(max(1, self.capacity // 2)))))
+        self.interactive_reserve = min(self.capacity - 1, int(os.getenv("SCHED_INTERACTIVE_RESERVE", "2")))
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.capacity + self.max_queued,
+            thread_name_prefix="upstream"
+        )
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0  # Queued tickets not yet granted or abandoned
+        self.queue = []  # heap of (priority, finish_tag, seq, ticket)
+        self.seq = itertools.count()
+        self.virtual_time = 0.0
+        self.session_finish = {}  # session -> (finish tag of its latest job, enqueued at)
+        self.session_ttl = float(os.getenv("SCHED_SESSION_TTL_S", "60"))
+        self.session_active = {}  # session -> slots currently held
+        self.prune_at = 256  # Prune session_finish when it grows past this
+        self.metrics = {job_class: _ClassMetrics() for job_class in PRIORITIES}
+
+    def set_weight(self, session: str, weight: float):
+        """
+        Sets a session's fair-queuing weight for jobs it enqueues from now on.
+        """
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self.lock:
+            self.session_weights[session] = weight
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs blocking upstream work (which may wait in slot()) on the scheduler's executor,
+        in the caller's context (session, class, credentials).
+        """
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def _enqueue(self, session, job_class, on_grant) -> _Ticket:
+        with self.lock:
+            if self.waiting >= self.max_queued:
+                self.metrics[job_class].rejected += 1
+                raise SchedulerFull(f"{job_class} job for {session} rejected: {self.waiting} jobs queued")
+            self.waiting += 1
+            if len(self.session_finish) > self.prune_at:
+                self._prune_sessions()
+            weight = self.session_weights.get(session, self.default_weight)
+            start_tag = max(self.virtual_time, self.session_finish.get(session, (0.0, 0))[0])
+            finish_tag = start_tag + 1.0 / weight
+            self.session_finish[session] = (finish_tag, time.monotonic())
+            ticket = _Ticket(session, job_class, start_tag, on_grant)
+            heapq.heappush(self.queue, (PRIORITIES[job_class], finish_tag, next(self.seq), ticket))
+            self._dispatch()
+        return ticket
+
+    def _prune_sessions(self):
+        # Caller holds self.lock. Forget sessions whose finish tag no longer affects any start
+        # tag (at or behind virtual time), or that hold no slot and have been quiet for the TTL.
+        cutoff = time.monotonic() - self.session_ttl
+        self.session_finish = {
+            session: (finish, touched) for session, (finish, touched) in self.session_finish.items()
+            if finish > self.virtual_time and (touched > cutoff or session in self.session_active)
+        }
+        self.prune_at = max(256, 2 * len(self.session_finish))
+
+    def _dispatch(self):
+        # Caller holds self.lock
+        deferred = []  # Eligible later: their session is at its cap
+        while self.active < self.capacity and self.queue:
+            entry = heapq.heappop(self.queue)
+            ticket = entry[-1]
+            if ticket.abandoned:
+                continue
+            if ticket.job_class != INTERACTIVE and self.active >= self.capacity - self.interactive_reserve:
+                # Heap is ordered by class first, so nothing interactive is left behind this one
+                deferred.append(entry)
+                break
+            if self.session_active.get(ticket.session, 0) >= self.session_max_active:
+                deferred.append(entry)
+                continue
+            self.session_active[ticket.session] = self.session_active.get(ticket.session, 0) + 1
+            self.active += 1
+            self.waiting -= 1
+            ticket.granted = True
+            self.virtual_time = max(self.virtual_time, ticket.start_tag)
+            metrics = self.metrics[ticket.job_class]
+            metrics.granted += 1
+            metrics.waits.append(time.monotonic() - ticket.enqueued)
+            ticket.on_grant()
+        for entry in deferred:
+            heapq.heappush(self.queue, entry)
+        if not self.queue and not self.active:
+            # Idle: forget per-session history so it doesn't grow unbounded
+            self.session_finish.clear()
+
+    def _abandon(self, ticket) -> bool:
+        """
+        Gives up on a queued ticket. Returns True if it had already been granted.
+        """
+        with self.lock:
+            if ticket.granted:
+                return True
+            ticket.abandoned = True
+            self.waiting -= 1
+            return False
+
+    def release(self, ticket):
+        with self.lock:
+            self.active -= 1
+            held = self.session_active.get(ticket.session, 0) - 1
+            if held > 0:
+                self.session_active[ticket.session] = held
+            else:
+                self.session_active.pop(ticket.session, None)
+            self._dispatch()
+
+    def _resolve(self, session, job_class):
+        return session or current_session.get(), job_class or current_job_class.get()
+
+    @contextmanager
+    def slot(self, session: str = None, job_class: str = None):
+        """
+        Blocking acquire for worker threads. Raises SchedulerTimeout past the class deadline.
+        """
+        session, job_class = self._resolve(session, job_class)
+        granted = threading.Event()
+        ticket = self._enqueue(session, job_class, granted.set)
+        if not granted.wait(self.deadlines[job_class]) and not self._abandon(ticket):
+            self.metrics[job_class].timeouts += 1
+            raise SchedulerTimeout(f"{job_class} job for {session} waited too long")
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, session: str = None, job_class: str = None):
+        """
+        Non-blocking acquire for coroutines.
+        """
+        session, job_class = self._resolve(session, job_class)
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def on_grant():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        ticket = self._enqueue(session, job_class, on_grant)
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self.deadlines[job_class])
+        except asyncio.TimeoutError:
+            if not self._abandon(ticket):
+                self.metrics[job_class].timeouts += 1
+                raise SchedulerTimeout(f"{job_class} job for {session} waited too long")
+        except asyncio.CancelledError:
+            if self._abandon(ticket):
+                self.release(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def scheduled_iter(self, iterator, session: str = None, job_class: str = None):
+        """
+        Wraps a lazy upstream iterator (e.g. a TTS stream) so it holds a slot while being consumed.
+        Session and class are captured now, since iteration may happen in another context.
+        """
+        session, job_class = self._resolve(session, job_class)
+
+        def iter_in_slot():
+            with self.slot(session, job_class):
+                yield from iterator
+
+        return iter_in_slot()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            queued = {job_class: 0 for job_class in PRIORITIES}
+            for _, _, _, ticket in self.queue:
+                if not ticket.abandoned:
+                    queued[ticket.job_class] += 1
+            active = self.active
+        return {
+            "capacity": self.capacity,
+            "active": active,
+            "max_queued": self.max_queued,
+            "session_max_active": self.session_max_active,
+            "interactive_reserve": self.interactive_reserve,
+            "default_weight": self.default_weight,
+            "session_weights": dict(self.session_weights),
+            "classes": {
+                job_class: {
+                    "queued": queued[job_class],
+                    "deadline_ms": round(self.deadlines[job_class] * 1000),
+                    **metrics.snapshot(),
+                }
+                for job_class, metrics in self.metrics.items()
+            },
+        }
@@ -0,0 +1,30 @@
+import os
+import hmac
+import hashlib
+import secrets
+
+
+class SessionIds:
+    """
+    Issues opaque session ids signed with a server secret. Scheduling fairness and credential
+    bindings only key on ids that verify, so a client can't pick (or forge) its own.
+    Set SESSION_SECRET to keep ids valid across restarts and replicas; otherwise each process
+    uses a random secret and clients are simply re-issued an id after a restart.
+    """
+
+    def __init__(self):
+        secret = os.getenv("SESSION_SECRET")
+        self.secret = secret.encode() if secret else secrets.token_bytes(32)
+
+    def _sign(self, token: str) -> str:
+        return hmac.new(self.secret, token.encode(), hashlib.sha256).hexdigest()[:24]
+
+    def issue(self) -> str:
+        token = secrets.token_urlsafe(16)
+        return f"{token}.{self._sign(token)}"
+
+    def verify(self, session_id) -> bool:
+        if not session_id or "." not in session_id:
+            return False
+        token, signature = session_id.rsplit(".", 1)
+        return hmac.compare_digest(signature, self._sign(token))
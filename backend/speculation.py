@@ -0,0 +1,127 @@
+import os
+import re
+import time
+import asyncio
+import difflib
+
+
+def normalise(text: str) -> str:
+    return re.sub(r"[^\w\s@]", "", text.lower()).strip()
+
+
+def transcripts_match(draft_text: str, final_text: str, min_ratio: float) -> bool:
+    return difflib.SequenceMatcher(None, normalise(draft_text), normalise(final_text)).ratio() >= min_ratio
+
+
+class SpeculationStats:
+    """
+    Counters for speculative drafts, exposed via /api/speculation/stats.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.committed = 0
+        self.aborted = 0
+        self.saved_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        resolved = self.committed + self.aborted
+        return {
+            "drafts_started": self.started,
+            "committed": self.committed,
+            "aborted": self.aborted,
+            "commit_rate": round(self.committed / resolved, 3) if resolved else None,
+            "abort_rate": round(self.aborted / resolved, 3) if resolved else None,
+            "latency_saved_total_ms": round(self.saved_seconds * 1000),
+            "latency_saved_avg_ms": round(self.saved_seconds * 1000 / self.committed) if self.committed else None,
+        }
+
+
+class Speculator:
+    """
+    Starts generation from a partial transcript once it has been stable for `stable_window` seconds.
+    On the final transcript the draft is committed if the texts match closely enough,
+    otherwise it is cancelled and the caller generates from scratch.
+    """
+
+    def __init__(self, draft, stats: SpeculationStats):
+        self.draft = draft  # async fn(text) -> result
+        self.stats = stats
+        self.stable_window = float(os.getenv("SPECULATION_STABLE_MS", "400")) / 1000
+        self.min_ratio = float(os.getenv("SPECULATION_MATCH_RATIO", "0.9"))
+        self.enabled = os.getenv("SPECULATION_ENABLED", "true").lower() != "false"
+        self.timer = None
+        self.partial_text = ""  # Normalised text the stability timer is running for
+        self.draft_task = None
+        self.draft_text = ""
+        self.draft_started = 0.0
+
+    def on_partial(self, text: str):
+        if not self.enabled:
+            return
+        partial_text = normalise(text)
+        if self.timer and partial_text == self.partial_text:
+            return  # Scribe re-sent the same partial: it is still stable, keep the timer running
+        if self.timer:
+            self.timer.cancel()
+        self.partial_text = partial_text
+        self.timer = asyncio.create_task(self._start_when_stable(text))
+
+    async def _start_when_stable(self, text: str):
+        await asyncio.sleep(self.stable_window)
+        if self.draft_task and transcripts_match(self.draft_text, text, self.min_ratio):
+            return  # Current draft still covers this partial
+        self._abort()
+        self.draft_text = text
+        self.draft_started = time.monotonic()
+        self.draft_task = asyncio.create_task(self._run_draft(text))
+        self.stats.started += 1
+
+    async def _run_draft(self, text: str):
+        result = await self.draft(text)
+        return result, time.monotonic()
+
+    async def resolve(self, final_text: str):
+        """
+        Returns the committed draft result for `final_text`, or None if there is no usable draft.
+        """
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.partial_text = ""
+        task = self.draft_task
+        if not task:
+            return None
+        if not transcripts_match(self.draft_text, final_text, self.min_ratio):
+            self._abort()
+            return None
+
+        final_at = time.monotonic()
+        self.draft_task = None
+        try:
+            result, finished_at = await task
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception as e:
+            print(f"Speculative draft error: {e}")
+            self.stats.aborted += 1
+            return None
+
+        # Time the draft had already spent working before the final transcript arrived
+        self.stats.committed += 1
+        self.stats.saved_seconds += min(final_at, finished_at) - self.draft_started
+        return result
+
+    def _abort(self):
+        if self.draft_task:
+            self.draft_task.cancel()
+            self.draft_task = None
+            self.stats.aborted += 1
+
+    def cancel(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.partial_text = ""
+        self._abort()
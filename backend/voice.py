@@ -0,0 +1,226 @@
+import json
+import base64
+import asyncio
+import urllib.parse
+from websockets.asyncio.client import connect as websocket_connect
+from websockets.exceptions import ConnectionClosed
+from fastapi import WebSocket, WebSocketDisconnect
+try:
+    from backend.speculation import Speculator
+except ModuleNotFoundError:
+    from speculation import Speculator
+
+SCRIBE_REALTIME_URL = "wss://api.elevenlabs.io/v1/speech-to-text/realtime"
+
+
+class ScribeProxy:
+    """
+    Upstream bridge to ElevenLabs Scribe v2 Realtime.
+    Mic audio (16 kHz PCM) goes up, partial/committed transcripts come back via `on_transcript`.
+    """
+
+    def __init__(self, api_key: str, on_transcript, sample_rate: int = 16000):
+        self.api_key = api_key
+        self.on_transcript = on_transcript
+        self.sample_rate = sample_rate
+        self.ws = None
+        self.reader = None
+
+    async def connect(self):
+        query = urllib.parse.urlencode({
+            "model_id": "scribe_v2_realtime",
+            "audio_format": f"pcm_{self.sample_rate}",
+            "commit_strategy": "vad",
+        })
+        self.ws = await websocket_connect(
+            f"{SCRIBE_REALTIME_URL}?{query}",
+            additional_headers={"xi-api-key": self.api_key}
+        )
+        self.reader = asyncio.create_task(self._read_loop())
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None
+
+    async def send_audio(self, pcm: bytes, commit: bool = False):
+        if not self.ws:
+            return
+        try:
+            await self.ws.send(json.dumps({
+                "message_type": "input_audio_chunk",
+                "audio_base_64": base64.b64encode(pcm).decode("ascii"),
+                "commit": commit,
+                "sample_rate": self.sample_rate,
+            }))
+        except ConnectionClosed:
+            self.ws = None  # The session reconnects on the next audio frame
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                message_type = message.get("message_type")
+                if message_type == "partial_transcript":
+                    await self.on_transcript(message.get("text", ""), False)
+                elif message_type in ("committed_transcript", "committed_transcript_with_timestamps"):
+                    await self.on_transcript(message.get("text", ""), True)
+                elif "error" in (message_type or ""):
+                    print(f"Scribe error: {message}")
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            print(f"Scribe proxy error: {e}")
+        finally:
+            # Connection is gone or unusable: mark it so the session reconnects on the next frame
+            ws, self.ws = self.ws, None
+            if ws:
+                await ws.close()
+
+    async def close(self):
+        ws, self.ws = self.ws, None
+        if self.reader:
+            self.reader.cancel()
+        if ws:
+            await ws.close()
+
+
+class VoiceSession:
+    """
+    One full-duplex voice conversation over a single WebSocket.
+
+    Upstream (client -> server):
+      - binary frames: mic audio, proxied to Scribe
+      - {"type": "start", ...}: session options (target_persona(s)), same keys as /api/warroom
+      - {"type": "transcript", "text": ..., "final": bool}: local stand-in when STT runs elsewhere
+      - {"type": "barge_in"}: client-side VAD detected speech
+    Downstream (server -> client):
+      - NDJSON-style text frames: transcript, filler, response, audio_start, audio_end, cancelled, done
+      - binary frames: TTS audio for the preceding audio_start
+
+    `respond(text, options, draft)` is an async generator yielding str events or bytes audio frames.
+    Any new user speech cancels the in-flight turn (barge-in).
+
+    If `draft(text, options)` is given, stable partial transcripts start it speculatively and
+    its result is handed to `respond` when the final transcript matches (None otherwise).
+    """
+
+    def __init__(self, websocket: WebSocket, respond, scribe_api_key: str = None,
+                 draft=None, speculation_stats=None):
+        self.websocket = websocket
+        self.respond = respond
+        self.scribe_api_key = scribe_api_key
+        self.speculator = None
+        if draft and speculation_stats:
+            self.speculator = Speculator(lambda text: draft(text, self.options), speculation_stats)
+        self.options = {}
+        self.scribe = None
+        self.turn_task = None
+        self.send_lock = asyncio.Lock()
+
+    async def send(self, frame):
+        async with self.send_lock:
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame.rstrip("\n"))
+
+    async def send_event(self, event_type: str, **fields):
+        await self.send(json.dumps({"type": event_type, **fields}))
+
+    async def run(self):
+        await self.websocket.accept()
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    await self.on_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    await self.on_text_frame(message["text"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self.cancel_turn()
+            if self.speculator:
+                self.speculator.cancel()
+            if self.scribe:
+                await self.scribe.close()
+
+    async def on_text_frame(self, text: str):
+        try:
+            message = json.loads(text)
+        except json.JSONDecodeError:
+            message = None
+        if not isinstance(message, dict):
+            await self.send_event("error", detail="Control frames must be JSON objects")
+            return
+        await self.on_control(message)
+
+    async def on_audio(self, pcm: bytes):
+        if self.scribe and not self.scribe.connected:
+            # Scribe closed the connection: drop the proxy and reconnect below
+            await self.scribe.close()
+            self.scribe = None
+        if not self.scribe:
+            if not self.scribe_api_key:
+                await self.send_event("error", detail="Speech-to-text not configured; send transcript frames")
+                return
+            self.scribe = ScribeProxy(self.scribe_api_key, self.on_transcript)
+            try:
+                await self.scribe.connect()
+            except Exception as e:
+                print(f"Scribe connect error: {e}")
+                self.scribe = None
+                await self.send_event("error", detail="Failed to connect to speech-to-text")
+                return
+        await self.scribe.send_audio(pcm)
+
+    async def on_control(self, message: dict):
+        message_type = message.get("type")
+        if message_type == "start":
+            self.options = {k: v for k, v in message.items() if k != "type"}
+        elif message_type == "transcript":
+            text = message.get("text", "")
+            if not isinstance(text, str):
+                await self.send_event("error", detail="Transcript text must be a string")
+                return
+            await self.on_transcript(text, bool(message.get("final")))
+        elif message_type == "barge_in":
+            await self.barge_in()
+
+    async def on_transcript(self, text: str, final: bool):
+        await self.send_event("transcript", text=text, final=final)
+        if not text.strip():
+            return
+        await self.barge_in()
+        if final:
+            self.turn_task = asyncio.create_task(self.run_turn(text))
+        elif self.speculator:
+            self.speculator.on_partial(text)
+
+    async def barge_in(self):
+        if self.turn_task and not self.turn_task.done():
+            await self.cancel_turn()
+            await self.send_event("cancelled")
+
+    async def cancel_turn(self):
+        if self.turn_task and not self.turn_task.done():
+            self.turn_task.cancel()
+            try:
+                await self.turn_task
+            except asyncio.CancelledError:
+                pass
+        self.turn_task = None
+
+    async def run_turn(self, text: str):
+        try:
+            draft = await self.speculator.resolve(text) if self.speculator else None
+            async for frame in self.respond(text, self.options, draft):
+                await self.send(frame)
+            await self.send_event("done")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Voice turn error: {e}")
+            await self.send_event("error", detail="Turn failed")
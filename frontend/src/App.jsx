@@ -2,6 +2,7 @@ import { useState, useEffect, useRef } from 'react'
 import { Mic, Send, MicOff, Sparkles, MessageSquare, Phone, PhoneOff, Smile, Frown, Flame, Ghost, Skull, SlidersHorizontal, Lock, ArrowRight, Play } from 'lucide-react'
 import { motion, AnimatePresence } from 'framer-motion'
 import './index.css'
+import { apiFetch, setSessionId } from './session'
 
 // Configuration
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000/api"
@@ -76,18 +77,19 @@ function App() {
         setKeysDetected(true)
         // Auto-configure backend if keys exist
         try {
-          await fetch(`${API_URL}/config`, {
+          const res = await apiFetch(`${API_URL}/config`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ gemini_key: savedGemini, eleven_key: savedEleven })
           })
+          if (res.ok) setSessionId((await res.json()).session_id)
         } catch (err) {
           console.error("Auto-config failed:", err)
         }
       } else {
         // No keys found - check backend for .env keys
         try {
-          const testRes = await fetch(`${API_URL}/warroom`, {
+          const testRes = await apiFetch(`${API_URL}/warroom`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ message: 'test', target_personas: ['Joy'] })
@@ -120,13 +122,16 @@ function App() {
 
     try {
       // Quick validation test - send a minimal test request
-      const res = await fetch(`${API_URL}/config`, {
+      const res = await apiFetch(`${API_URL}/config`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ gemini_key: apiKeys.gemini, eleven_key: apiKeys.eleven })
       })
 
       if (res.ok) {
+        // Keys only apply to requests carrying this session id
+        setSessionId((await res.json()).session_id)
+
         // Save to localStorage
         if (apiKeys.gemini) localStorage.setItem('gemini_key', apiKeys.gemini)
         if (apiKeys.eleven) localStorage.setItem('eleven_key', apiKeys.eleven)
@@ -298,7 +303,7 @@ function App() {
 
     try {
       // Call warroom for multi-agent response
-      const warroomRes = await fetch(`${API_URL}/warroom`, {
+      const warroomRes = await apiFetch(`${API_URL}/warroom`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -334,7 +339,7 @@ function App() {
         const responseText = item.text  // Use text as-is from backend
 
         // Fetch audio for this segment FIRST (don't show text yet)
-        const audioRes = await fetch(`${API_URL}/warroom/audio`, {
+        const audioRes = await apiFetch(`${API_URL}/warroom/audio`, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({ persona: personaName, text: responseText })
@@ -401,7 +406,7 @@ function App() {
     setLastMessage({ role: 'system', text: "Initializing Fun Mode...", persona: "Headquarters" })
 
     try {
-      const response = await fetch(`${API_URL}/funmode/stream`, {
+      const response = await apiFetch(`${API_URL}/funmode/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -463,9 +468,10 @@ function App() {
   // Fetch Audio and add to Queue
   const fetchAudioAndQueue = async (item) => {
     try {
-      const audioRes = await fetch(`${API_URL}/warroom/audio`, {
+      const audioRes = await apiFetch(`${API_URL}/warroom/audio`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        // Debate lines are fetched ahead of playback: don't compete with live call audio
+        headers: { "Content-Type": "application/json", "X-Priority": "streaming" },
         body: JSON.stringify({ persona: item.persona, text: item.text })
       })
       const audioBlob = await audioRes.blob()
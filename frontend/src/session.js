@@ -0,0 +1,19 @@
+// Opaque session id issued by the backend. Upstream fair scheduling and judge keys
+// both key on it, so every call must send it.
+const SESSION_KEY = 'session_id'
+
+export const getSessionId = () => localStorage.getItem(SESSION_KEY)
+
+export const setSessionId = (id) => {
+  if (id) localStorage.setItem(SESSION_KEY, id)
+}
+
+// fetch() that sends our session id and keeps the one the backend issues whenever ours is
+// missing or no longer valid (e.g. after a server restart)
+export const apiFetch = async (url, options = {}) => {
+  const id = getSessionId()
+  const headers = id ? { ...options.headers, 'X-Session-Id': id } : options.headers
+  const res = await fetch(url, { ...options, headers })
+  setSessionId(res.headers.get('X-Session-Id'))
+  return res
+}
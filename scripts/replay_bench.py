@@ -0,0 +1,122 @@
+"""
+Deterministic latency benchmark for /api/warroom and /api/funmode/stream.
+
+Record once against the live upstreams, then replay on any commit with no network access:
+
+    UPSTREAM_CASSETTE=record python scripts/replay_bench.py
+    UPSTREAM_CASSETTE=replay python scripts/replay_bench.py --out before.json
+    ... change code ...
+    UPSTREAM_CASSETTE=replay python scripts/replay_bench.py --compare before.json
+
+UPSTREAM_REPLAY_SCALE scales the recorded upstream timing (e.g. 0.5 = twice as fast).
+Exits non-zero if any request missed the cassette or came back degraded, since those
+timings would measure canned fallbacks rather than the real pipeline.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+os.environ.setdefault("UPSTREAM_CASSETTE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes"))
+os.environ.setdefault("FILLER_ENABLED", "false")  # Keep filler warm-up out of the measurements
+
+from fastapi.testclient import TestClient
+import cassette
+import main
+
+SCENARIOS = [
+    ("warroom", "/api/warroom", {"message": "I just got a puppy but it chewed my homework"}),
+    ("warroom_mention", "/api/warroom", {"message": "@Fear @Disgust should I eat gas station sushi?"}),
+    ("funmode_short", "/api/funmode/stream", {"message": "Pineapple on pizza", "mode": "default"}),
+    ("funmode_long", "/api/funmode/stream", {"message": "Moving to a new city", "mode": "long"}),
+]
+
+
+def is_degraded(body: bytes) -> bool:
+    """
+    True if a JSON or NDJSON response contains any degraded (canned) line.
+    """
+    try:
+        items = json.loads(body).get("responses", [])
+    except ValueError:
+        items = [json.loads(line) for line in body.splitlines() if line.strip()]
+    return any(item.get("degraded") for item in items)
+
+
+def run_once(client, path, payload):
+    # Prompts include conversation history, so reset it to keep requests identical across runs
+    main.conversation_history.clear()
+    started = time.perf_counter()
+    first_byte = None
+    body = b""
+    with client.stream("POST", path, json=payload) as response:
+        for chunk in response.iter_bytes():
+            if chunk and first_byte is None:
+                first_byte = time.perf_counter() - started
+            body += chunk
+    total = time.perf_counter() - started
+    return first_byte or total, total, is_degraded(body)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    if cassette.MODE == "off":
+        print("Set UPSTREAM_CASSETTE=record or replay")
+        return 1
+
+    client = TestClient(main.app)
+    runs = 1 if cassette.MODE == "record" else args.runs
+    results = {}
+    invalid = []
+    for name, path, payload in SCENARIOS:
+        ttfb, total = [], []
+        misses_before = cassette.store.misses
+        degraded_runs = 0
+        for _ in range(runs):
+            cassette.store.rewind()
+            first, elapsed, degraded = run_once(client, path, payload)
+            ttfb.append(first * 1000)
+            total.append(elapsed * 1000)
+            degraded_runs += degraded
+        misses = cassette.store.misses - misses_before
+        results[name] = {
+            "ttfb_ms": round(statistics.median(ttfb), 1),
+            "total_ms": round(statistics.median(total), 1),
+        }
+        print(f"{name:18} ttfb {results[name]['ttfb_ms']:8.1f}ms   total {results[name]['total_ms']:8.1f}ms")
+        if misses or degraded_runs:
+            invalid.append(f"{name}: {misses} cassette miss(es), {degraded_runs} degraded run(s)")
+
+    if invalid:
+        # A miss trips the breaker and the rest is canned fallbacks: the numbers are meaningless
+        print("\nINVALID RUN (re-record with UPSTREAM_CASSETTE=record):")
+        for line in invalid:
+            print(f"  {line}")
+        return 1
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("\nvs baseline (total):")
+        for name, result in results.items():
+            if name in baseline:
+                before = baseline[name]["total_ms"]
+                delta = (result["total_ms"] - before) / before * 100 if before else 0
+                print(f"{name:18} {before:8.1f}ms -> {result['total_ms']:8.1f}ms ({delta:+.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
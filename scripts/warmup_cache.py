@@ -10,7 +10,12 @@ for emotion in emotions:
     start = time.time()
     try:
         # Request stream (which triggers generation & cache save in backend)
-        r = requests.get(f"http://localhost:8000/api/music?emotion={emotion}", stream=True)
+        # Marked as prefetch so warm-up never competes with live users for upstream capacity
+        r = requests.get(
+            f"http://localhost:8000/api/music?emotion={emotion}",
+            headers={"X-Priority": "prefetch"},
+            stream=True
+        )
         if r.status_code == 200:
             # Consume stream to ensure full generation
             size = 0